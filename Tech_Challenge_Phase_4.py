@@ -1,27 +1,18 @@
 import streamlit as st
 import pandas as pd
-from google.cloud import bigquery
-import altair as alt
-import matplotlib.pyplot as plt
-import seaborn as sns
-from statsmodels.tsa.seasonal import seasonal_decompose
-from database import BigQuery
+from decomposition import decomposition_service
+from aggregates import monthly_cube
+from analytics import cross_asset_analytics, LABELS as ASSET_LABELS
+from timeseries import time_series, COMPACT_MODE
+from report import report_data
+from downsampling import downsample
+from charts import chart_cache
+from instrumentation import recorder, ADMIN_PANEL
+from database import BigQuery, MarketData
 from class_prophet import Prophet_model
-import yfinance as yf
-
-# Baixar dados históricos do DXY e da taxa de juros de 10 anos
-dxy_data = yf.download("DX-Y.NYB", start="2019-01-01", end="2024-12-31")
-treasury_yield_data = yf.download("^TNX", start="2019-01-01", end="2024-12-31")
-
-# Selecionar o fechamento diário para análise e renomear as colunas
-dxy = pd.Series(dxy_data['Close'].values.squeeze(), name="indice_dolar_eua_dxy")
-treasury_yield = pd.Series(treasury_yield_data['Close'].values.squeeze(), name="tx_juros_eua")
-
-# Combinar os dados em um único DataFrame
-df_yfinance = pd.concat([dxy, treasury_yield], axis=1)
-
-# Definir o índice como a data do DXY
-df_yfinance.index = dxy_data.index # dxy_data contains the DatetimeIndex
+from worker import forecast_worker
+from api import start_api, API_ENABLED
+from backtest import load_results as load_backtest_results, HORIZON_DAYS
 
 model_code = """# Base de treino e validação (Série Não Estacionária)
 treino = df_base[df_base['ds'] < '2024-07-24']
@@ -60,16 +51,120 @@ print(f"RMSE: {rmse:.2f}")
 
 st.set_page_config(layout="wide")
 
-client = BigQuery()
-ipea_df, merged_df = client.create_dfs()
+# Spans de tempo por etapa deste rerun (ver instrumentation.py)
+recorder.begin_rerun()
+
+# Dias do histórico de treino exibidos junto das previsões, como contexto do gráfico
+HISTORY_TAIL_DAYS = 90
+
+with recorder.span('app.load_data') as span:
+    client = BigQuery()
+    ipea_df, merged_df = client.create_dfs()
+
+    # Frame compartilhado entre as sessões (float32 somente leitura com COMPACT_MODE=1);
+    # os filtros abaixo trabalham com recortes dele
+    ipea_ts = time_series(ipea_df, compact=COMPACT_MODE, dropna='preco_bpd_US')
+    ipea_df = ipea_ts.df
+    span['rows'] = len(ipea_df)
+
+# Previsões e decomposições calculadas em segundo plano, fora do script
+forecast_worker.start()
+
+# API HTTP de previsões e da série tratada, em uma porta própria (API_ENABLED=1)
+if API_ENABLED:
+    start_api()
+
+# DXY e taxa de juros de 10 anos, carregados sob demanda pelas abas que os utilizam
+market_data = MarketData()
 
 model = Prophet_model()
 
-# Create tabs
-tabs = st.tabs(["Introdução", "Relatório", "Dashboard", "Modelo Machine Learning"])
+def render_forecast(prediction_df, data_range, marker_date):
+    # altair só é importado quando uma previsão é exibida
+    import altair as alt
+
+    st.write("Previsão do preço em US$ para os próximos {} dias:".format(data_range))
+
+    col1, col2 = st.columns([1,3])
+    with col1:
+        
+        st.subheader("Previsões Geradas")
+        st.write(prediction_df[['ds', 'yhat']])
+
+    with col2:
+
+        line_chart = alt.Chart(downsample(prediction_df.reset_index(), 'ds', 'yhat')).mark_line().encode(
+            x=alt.X('ds:T', title='yhat', axis=alt.Axis(format='%d/%m/%Y', tickCount='day')),
+            y=alt.Y('yhat:Q', title='Preço Previsto (USD)') 
+        ).properties(
+            width=700,
+            height=400
+        )
+
+        marker = alt.Chart(pd.DataFrame({'ds': [marker_date]})).mark_rule(color='red').encode(
+            x='ds:T'
+        )
+
+        marker_text = alt.Chart(pd.DataFrame({'ds': [marker_date], 'yhat': [prediction_df.loc[prediction_df['ds'] == marker_date, 'yhat'].values[0]]})).mark_text(
+            align='right',
+            baseline='bottom',
+            color='white',
+            fontSize=12
+        ).encode(
+            x='ds:T',
+            y=alt.Y('yhat:Q'),
+            text=alt.value('Limite dos Dados de Treino')
+        )
+
+        final_chart = line_chart + marker + marker_text
+
+        st.subheader("Visualização gráfica das previsões geradas.")
+        with recorder.span('chart.render', rows=len(prediction_df)):
+            st.altair_chart(final_chart, use_container_width=True)
+
+
+def show_chart(kind, data, **params):
+    # Spec Vega-Lite servido pelo cache compartilhado. Cópia rasa: o Streamlit remove a chave
+    # 'datasets' do dict recebido, e o spec guardado precisa continuar completo
+    spec = chart_cache.spec(kind, data, **params)
+    with recorder.span('chart.render', rows=len(data)):
+        st.vega_lite_chart(dict(spec), use_container_width=True)
+
+
+def remembered(name, options, default):
+    # Só a aba ativa é renderizada e os widgets das outras saem da sessão: as escolhas do
+    # Dashboard ficam guardadas à parte e voltam como valor inicial enquanto as opções não mudarem
+    saved = st.session_state.setdefault('dashboard_filters', {}).get(name)
+    return saved[1] if saved is not None and saved[0] == options else default
+
+
+def remember(name, options, value):
+    st.session_state.setdefault('dashboard_filters', {})[name] = (options, value)
+    return value
+
+
+@st.fragment(run_every=1)
+def wait_for_forecast(forecast):
+    # Consulta o worker a cada segundo; ao terminar, reexecuta o app para exibir o resultado
+    if forecast.done():
+        st.rerun()
+    st.info("Calculando a previsão em segundo plano...")
+
+
+def rolling_chart_data(rolling_stats, stat):
+    # Formato longo para o gráfico de várias linhas, com cada ativo reduzido separadamente
+    frames = []
+    for name, label in ASSET_LABELS.items():
+        column = f'{stat}_{name}'
+        data = rolling_stats[[column]].rename_axis('data').reset_index()
+        frames.append(downsample(data, 'data', column).rename(columns={column: 'valor'}).assign(ativo=label))
+    return pd.concat(frames, ignore_index=True)
+
+
+# Abas: cada uma é uma função, e apenas a aba ativa é executada a cada rerun
 
 # Tab: Introdução
-with tabs[0]:
+def render_intro():
     with st.container():
         col1, col2, col3 = st.columns([1, 3, 1])
         with col2:
@@ -102,7 +197,7 @@ with tabs[0]:
             modelo de Machine Learning estão disponíveis em suas respectivas abas: Relatório, Dashboard e Modelo Machine Learning.""")
 
 # Tab: Relatório
-with tabs[1]:
+def render_report():
     with st.container():
         col1, col2, col3 = st.columns([1, 3, 1])
         with col2:
@@ -122,34 +217,12 @@ with tabs[1]:
             para os usuários.
             """)
             
-            st.header("Análise Exploratória de Dados")
-            ipea_df = ipea_df.dropna(subset=['preco_bpd_US'])
-            decomposition = seasonal_decompose(ipea_df['preco_bpd_US'], model='additive', period=12)
-            decomposition_data = pd.DataFrame({
-                'data': ipea_df.index,
-                'trend': decomposition.trend,
-                'seasonal': decomposition.seasonal,
-                'residual': decomposition.resid
-            }).dropna()
-
-            trend_chart = alt.Chart(decomposition_data).mark_line(color='blue').encode(
-                x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                y=alt.Y('trend', title='Preço do Petróleo (USD)')
-            ).properties(width=500, height=300)
-
-            seasonal_chart = alt.Chart(decomposition_data).mark_line(color='blue').encode(
-                x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                y=alt.Y('seasonal', title='')
-            ).properties(width=500, height=300)
-
-            residual_chart = alt.Chart(decomposition_data).mark_line(color='blue').encode(
-                x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                y=alt.Y('residual', title='')
-            ).properties(width=500, height=300)
+            # Decomposição, agregados e métricas do relatório, calculados uma vez por versão dos dados
+            report = report_data(ipea_df, market_data.get())
 
-                
+            st.header("Análise Exploratória de Dados")
             st.subheader("Tendência")
-            st.altair_chart(trend_chart, use_container_width=True)
+            show_chart('line', report['trend'], x='data:T', y='trend', y_title='Preço do Petróleo (USD)', color='blue')
 
             st.write("""**Análise de Tendência:** Ao examinar o gráfico de linha apresentado, podemos identificar a evolução dos preços do 
             petróleo entre 2020 e 2024. Notamos que, em 2020, houve uma forte queda nos preços devido à pandemia de COVID-19, que resultou 
@@ -161,7 +234,7 @@ with tabs[1]:
             """)
 
             st.subheader("Sazonalidade")
-            st.altair_chart(seasonal_chart, use_container_width=True)
+            show_chart('line', report['seasonal'], x='data:T', y='seasonal', y_title='', color='blue')
 
             st.write("""**Análise de Sazonalidade:** No gráfico acima podemos observar variações sazonais que podem estar associadas a eventos econômicos recorrentes. 
             É importante entender as flutuações periódicas nos preços e para fazer previsões mais precisas. 
@@ -169,7 +242,7 @@ with tabs[1]:
             """)
 
             st.subheader("Ruído")
-            st.altair_chart(residual_chart, use_container_width=True)
+            show_chart('line', report['residual'], x='data:T', y='residual', y_title='', color='blue')
 
             st.write("""**Análise de Ruído:** O ruído representa as flutuações aleatórias e imprevisíveis nos dados dos preços do petróleo. 
             Essas variações podem ser causadas por eventos inesperados, como desastres naturais, crises políticas, ou outras perturbações 
@@ -177,22 +250,7 @@ with tabs[1]:
             """)
  
             st.subheader("Variação Anual dos Preços do Petróleo")
-            
-            current_year = pd.Timestamp.now().year
-            start_year = current_year - 5
-
-            filtered_data = ipea_df[(ipea_df.index.year > start_year) & (ipea_df.index.year <= current_year)]
-
-            annual_prices = filtered_data.resample('YE').mean().reset_index()
-            bar_chart = alt.Chart(annual_prices).mark_bar().encode(
-                x=alt.X('year(data):T', title='Ano', axis=alt.Axis(labelAngle=0), bandPosition=0),
-                y=alt.Y('preco_bpd_US', title='Preço Médio por Barril (USD)')
-            ).properties(
-                width=700,
-                height=400
-            )
-
-            st.altair_chart(bar_chart, use_container_width=True)
+            show_chart('annual_bar', report['annual_prices'])
             
             st.write("""**Análise do Preço Médio por Barril:** Ao analisar o gráfico de barras da variação anual dos preços do petróleo, 
             podemos identificar anos específicos em que houve aumentos ou quedas significativas nos preços médios. Esses picos ou quedas podem estar associados a eventos econômicos ou 
@@ -205,15 +263,7 @@ with tabs[1]:
             """)
 
             st.subheader("Volatilidade Mensal do Preço do Petróleo ao Longo de 5 anos")
-            monthly_volatility = ipea_df['preco_bpd_US'].resample('ME').std().reset_index()
-            volatility_line_chart = alt.Chart(monthly_volatility).mark_line().encode(
-                x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                y=alt.Y('preco_bpd_US', title='Desvio Padrão Mensal (USD)')
-            ).properties(
-                width=700,
-                height=400
-            )
-            st.altair_chart(volatility_line_chart, use_container_width=True)
+            show_chart('line', report['monthly_volatility'], x='data:T', y='preco_bpd_US', y_title='Desvio Padrão Mensal (USD)', width=700, height=400)
 
             st.write("""**Análise de Volatilidade:** O gráfico acima mostra a volatilidade mensal dos preços do petróleo ao longo dos últimos 5 anos. 
             Podemos observar períodos de alta volatilidade, indicando maior instabilidade nos preços, e períodos de baixa volatilidade, indicando maior estabilidade nos preços.
@@ -231,9 +281,7 @@ with tabs[1]:
 
             col1, col2, col3 = st.columns(3)
 
-            m_price_p = round(float(ipea_df['preco_bpd_US'].mean()),2)
-            m_dxy_eua = round(float(df_yfinance['indice_dolar_eua_dxy'].mean()),2)
-            m_tx_eua = round(float(df_yfinance['tx_juros_eua'].mean()),2)
+            m_price_p, m_dxy_eua, m_tx_eua = report['m_price_p'], report['m_dxy_eua'], report['m_tx_eua']
 
             with col1:
                 st.metric(label="Preço Médio do Petróleo", value=f"${m_price_p:,.2f}".replace('.', ','))
@@ -253,23 +301,8 @@ with tabs[1]:
 
             st.subheader("Análise da média diaria de consumo de petróleo por ano vs preço médio") 
 
-            consumption_chart = alt.Chart(merged_df).mark_area(opacity=0.4, color='blue').encode(
-                x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
-                y=alt.Y('Consumo', title='Consumo (média Mi. barris p/ dia)', axis=alt.Axis(titleColor='blue'),
-                    scale=alt.Scale(domain=[0, merged_df['Consumo'].max()])),
-                    ).properties(width=500, height=302)
-
-            price_chart = alt.Chart(merged_df).mark_area(opacity=0.4, color='darkred').encode(
-                x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
-                y=alt.Y('preco_bpd_US', title='Preço Médio por Barril (USD)', axis=alt.Axis(titleColor='darkred'),
-                    scale=alt.Scale(domain=[0, merged_df['preco_bpd_US'].max()])),
-                    ).properties(width=500, height=302)
-
-            combined_chart = alt.layer(consumption_chart, price_chart).resolve_scale(
-                y='independent')
-
             st.markdown("<h4 style='font-size: 22px;'>Consumo Mundial de Petróleo vs. Preço Médio</h4>", unsafe_allow_html=True)
-            st.altair_chart(combined_chart, use_container_width=True)
+            show_chart('consumption_price', merged_df)
 
             st.write("""**Análise de Consumo Mundial vs. Preço Médio:** 
             O gráfico acima compara a média diária por ano de consumo de petróleo com o preço médio do petróleo ao longo dos anos.
@@ -337,8 +370,9 @@ with tabs[1]:
             O modelo e os gráficos no dashboard apresentam insights importantes que podem auxiliar nas previsões dos preços nos próximos anos, porém, conforme citado anteriormente,
             fatores externos que não podem ser previstos geram uma grande variação no preço do petróleo.
             """)
-                    
-with tabs[2]:
+
+# Tab: Dashboard
+def render_dashboard():
     with st.container():
         col_dash, col_filters = st.columns([5, 1])
 
@@ -348,61 +382,80 @@ with tabs[2]:
             max_date = ipea_df.index.max()
             
             
-            start_date = st.date_input("Data de Início", value=min_date, min_value=min_date, max_value=max_date)
-            end_date = st.date_input("Data de Fim", value=max_date, min_value=min_date, max_value=max_date)
+            bounds = (min_date, max_date)
+            start_date = remember('start_date', bounds, st.date_input("Data de Início", value=remembered('start_date', bounds, min_date), min_value=min_date, max_value=max_date))
+            end_date = remember('end_date', bounds, st.date_input("Data de Fim", value=remembered('end_date', bounds, max_date), min_value=min_date, max_value=max_date))
 
             
             start_date = pd.to_datetime(start_date)
             end_date = pd.to_datetime(end_date)
 
             
-            filtered_data = ipea_df[(ipea_df.index >= start_date) & (ipea_df.index <= end_date)]
+            # Recortes por data via busca binária no índice ordenado
+            filtered_data = ipea_ts.range(start_date, end_date)
             filtered_merged_df = merged_df[(merged_df['year'] >= start_date.year) & (merged_df['year'] <= end_date.year)]
 
             
             min_price = float(filtered_data['preco_bpd_US'].min())
             max_price = float(filtered_data['preco_bpd_US'].max())
-            price_range = st.slider(
+            price_range = remember('price_range', (min_price, max_price), st.slider(
                 "Preço do Petróleo (USD)",
                 min_value=min_price,
                 max_value=max_price,
-                value=(min_price, max_price),
+                value=remembered('price_range', (min_price, max_price), (min_price, max_price)),
                 step=0.1
-            )
+            ))
 
-            
-            filtered_data = filtered_data[(filtered_data['preco_bpd_US'] >= price_range[0]) & (filtered_data['preco_bpd_US'] <= price_range[1])]
+            # Sem filtro de preço, anos e meses são filtrados pelas posições pré-calculadas do índice
+            # e as agregações saem do cubo mensal; o filtro de preço exige voltar às máscaras diárias
+            full_price_range = price_range == (min_price, max_price)
+            if not full_price_range:
+                filtered_data = filtered_data[(filtered_data['preco_bpd_US'] >= price_range[0]) & (filtered_data['preco_bpd_US'] <= price_range[1])]
             #filtered_merged_df = filtered_merged_df[(filtered_merged_df['preco_bpd_US'] >= price_range[0]) & (filtered_merged_df['preco_bpd_US'] <= price_range[1])]
             
-            years = filtered_data.index.year.unique()
-            selected_years = st.multiselect("Selecione o Ano", options=years, default=years.tolist())
+            years = ipea_ts.years(start_date, end_date) if full_price_range else filtered_data.index.year.unique()
+            selected_years = remember('years', tuple(years), st.multiselect("Selecione o Ano", options=years, default=remembered('years', tuple(years), years.tolist())))
             if not selected_years:
                 st.warning("Selecione pelo menos um ano.")
                 selected_years = years.tolist()
-            filtered_data = filtered_data[filtered_data.index.year.isin(selected_years)]
             filtered_merged_df = filtered_merged_df[filtered_merged_df['year'].isin(selected_years)]
             
-            months = filtered_data.index.month.unique()
-            selected_months = st.multiselect("Selecione o Mês", options=months, default=months.tolist())
-            filtered_data = filtered_data[filtered_data.index.month.isin(selected_months)]
+            if full_price_range:
+                months = ipea_ts.months(start_date, end_date, selected_years)
+            else:
+                filtered_data = filtered_data[filtered_data.index.year.isin(selected_years)]
+                months = filtered_data.index.month.unique()
+            selected_months = remember('months', tuple(months), st.multiselect("Selecione o Mês", options=months, default=remembered('months', tuple(months), months.tolist())))
+            if full_price_range:
+                filtered_data = ipea_ts.select(start_date, end_date, selected_years, selected_months)
+            else:
+                filtered_data = filtered_data[filtered_data.index.month.isin(selected_months)]
             #filtered_merged_df = filtered_merged_df[filtered_merged_df['data'].dt.month.isin(selected_months)]
 
-            volatility_window = st.slider("Janela para Média Móvel de Volatilidade (em meses)", min_value=1, max_value=12, value=1)
-            monthly_volatility_data = filtered_data['preco_bpd_US'].resample('ME').std().reset_index()
+            volatility_window = remember('volatility_window', None, st.slider("Janela para Média Móvel de Volatilidade (em meses)", min_value=1, max_value=12, value=remembered('volatility_window', None, 1)))
+
+            if full_price_range:
+                cube = monthly_cube(ipea_df['preco_bpd_US'])
+                monthly_volatility_data = cube.monthly_std(start_date, end_date, selected_years, selected_months)
+            else:
+                monthly_volatility_data = filtered_data['preco_bpd_US'].resample('ME').std().reset_index()
             monthly_volatility_data['volatility_moving_avg'] = monthly_volatility_data['preco_bpd_US'].rolling(window=volatility_window).mean()
 
             seasonality_options = ["Anual", "Mensal"]
-            seasonality_choice = st.selectbox(
+            seasonality_choice = remember('seasonality', None, st.selectbox(
                 "Período da Decomposição Sazonal (Aplicável para Gráficos de Tendência, Sazonalidade e Ruído)",
                 seasonality_options,
-                index=1
-            )
+                index=seasonality_options.index(remembered('seasonality', None, "Mensal"))
+            ))
 
             if seasonality_choice == "Anual":
                 period = 365 
             else:
                 period = 12
 
+            correlation_window = remember('correlation_window', None, st.slider("Janela da Correlação e do Beta Móveis com DXY e Juros (dias de pregão)", min_value=20, max_value=250, step=5, value=remembered('correlation_window', None, 60)))
+            max_lag = remember('max_lag', None, st.slider("Defasagem Máxima da Correlação Cruzada (dias de pregão)", min_value=5, max_value=30, value=remembered('max_lag', None, 10)))
+
             st.write(f"Janela para Média Móvel de Volatilidade: {volatility_window} meses")
 
             st.subheader("Filtros Aplicados:")
@@ -413,14 +466,15 @@ with tabs[2]:
             st.markdown(f"**Meses Selecionados:** {', '.join(map(str, selected_months))}")
             st.markdown(f"**Janela para Média Móvel de Volatilidade:** {volatility_window} meses")
             st.markdown(f"**Período da Decomposição Sazonal:** {seasonality_choice}")
+            st.markdown(f"**Janela da Correlação Móvel:** {correlation_window} dias de pregão")
 
         with col_dash:
             st.header("Dashboard")
             
             col1, col2, col3 = st.columns(3)
 
-            df_petroleo = ipea_df[(ipea_df.index >= start_date) & (ipea_df.index <= end_date)]
-            df_yfinance_filter = df_yfinance[(df_yfinance.index >= start_date) & (df_yfinance.index <= end_date)]
+            df_petroleo = ipea_ts.range(start_date, end_date)
+            df_yfinance_filter = time_series(market_data.get(), compact=COMPACT_MODE).range(start_date, end_date)
             m_price_p = round(float(df_petroleo['preco_bpd_US'].mean()),2)
             m_dxy_eua = round(float(df_yfinance_filter['indice_dolar_eua_dxy'].mean()),2)
             m_tx_eua = round(float(df_yfinance_filter['tx_juros_eua'].mean()),2)
@@ -440,63 +494,33 @@ with tabs[2]:
             with col4:
                 st.subheader("Variação Anual da Media dos Preços do Petróleo")
                 try:
-                    annual_prices = filtered_data.resample('YE').mean().reset_index()
-                    years_in_data = annual_prices['data'].dt.year.unique()
-
-                    bar_chart = alt.Chart(annual_prices).mark_bar(color='steelblue').encode(
-                        x=alt.X('year(data):O',  # Change to 'O' for ordinal (categorical) encoding
-                                title='Ano',
-                                axis=alt.Axis(
-                                    labelAngle=0, 
-                                    labelAlign='center',  # Center the labels horizontally
-                                    labelOffset=10  # Optional: Adjust if labels are too close/far from bars
-                                ),
-                                scale=alt.Scale(domain=list(years_in_data))),  # Use the exact years
-                        y=alt.Y('preco_bpd_US', title='Preço Médio por Barril (USD)'),
-                    ).properties(width=500, height=303)
-
-                    st.altair_chart(bar_chart, use_container_width=True)
+                    if full_price_range:
+                        annual_prices = cube.annual_mean(start_date, end_date, selected_years, selected_months)
+                    else:
+                        annual_prices = filtered_data.resample('YE').mean().reset_index()
+                    show_chart('annual_bar_years', annual_prices)
                 except Exception as e:
                     st.error(f"Erro ao gerar o gráfico de Variação Anual dos Preços do Petróleo: {e}")
 
             with col4:
                 st.subheader("Volatilidade Mensal (com Média Móvel)")
                 try:
-                    volatility_chart = alt.Chart(monthly_volatility_data).mark_line(color='cornflowerblue').encode(
-                        x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                        y=alt.Y('volatility_moving_avg', title='Volatilidade Mensal com Média Móvel (USD)')
-                    ).properties(width=500, height=302)
-                    st.altair_chart(volatility_chart, use_container_width=True)
+                    show_chart('line', downsample(monthly_volatility_data, 'data', 'volatility_moving_avg'), x='data:T', y='volatility_moving_avg',
+                               y_title='Volatilidade Mensal com Média Móvel (USD)', color='cornflowerblue', height=302)
                 except Exception as e:
                     st.error(f"Erro ao gerar o gráfico de Volatilidade Mensal: {e}")
             
             with col4:
                 try:
-                    consumption_chart = alt.Chart(filtered_merged_df).mark_area(opacity=0.4, color='blue').encode(
-                        x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
-                        y=alt.Y('Consumo', title='Consumo (média Mi. barris p/ dia)', axis=alt.Axis(titleColor='blue'),
-                                scale=alt.Scale(domain=[0, filtered_merged_df['Consumo'].max()])),
-                    ).properties(width=500, height=302)
-
-                    price_chart = alt.Chart(filtered_merged_df).mark_area(opacity=0.4, color='darkred').encode(
-                        x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
-                        y=alt.Y('preco_bpd_US', title='Preço Médio do Petróleo (USD)', axis=alt.Axis(titleColor='darkred'),
-                                scale=alt.Scale(domain=[0, filtered_merged_df['preco_bpd_US'].max()])),
-                    ).properties(width=500, height=302)
-
-                    combined_chart = alt.layer(consumption_chart, price_chart).resolve_scale(
-                        y='independent'
-                    )
-
                     st.markdown("<h4 style='font-size: 22px;'>Consumo Mundial de Petróleo vs. Preço Médio</h4>", unsafe_allow_html=True)
-                    st.altair_chart(combined_chart, use_container_width=True)
+                    show_chart('consumption_price', filtered_merged_df, price_title='Preço Médio do Petróleo (USD)')
                 except Exception as e:
                     st.error(f"Erro ao gerar o gráfico de Consumo Mundial e Preço Médio: {e}")
 
             with col5:
                 try:
-                    filtered_data = filtered_data.dropna(subset=['preco_bpd_US'])
-                    decomposition = seasonal_decompose(filtered_data['preco_bpd_US'], model='additive', period=period)
+                    # Recortes contínuos reaproveitam a decomposição da série completa
+                    decomposition = decomposition_service.decompose(filtered_data['preco_bpd_US'], period=period, base=ipea_df['preco_bpd_US'])
                     decomposition_data = pd.DataFrame({
                         'data': filtered_data.index,
                         'trend': decomposition.trend,
@@ -504,79 +528,103 @@ with tabs[2]:
                         'residual': decomposition.resid
                     }).dropna()
 
-                    trend_chart = alt.Chart(decomposition_data).mark_line(color='darkgreen').encode(
-                        x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                        y=alt.Y('trend', title='Tendência')
-                    ).properties(width=500, height=300)
-
-                    seasonal_chart = alt.Chart(decomposition_data).mark_line(color='seagreen').encode(
-                        x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                        y=alt.Y('seasonal', title='Sazonalidade')
-                    ).properties(width=500, height=300)
-
-                    residual_chart = alt.Chart(decomposition_data).mark_line(color='firebrick').encode(
-                        x=alt.X('data:T', title='Data', axis=alt.Axis(format='%Y-%m', tickCount='month')),
-                        y=alt.Y('residual', title='Ruído')
-                    ).properties(width=500, height=300)
-
                     st.subheader("Tendência")
-                    st.altair_chart(trend_chart, use_container_width=True)
+                    show_chart('line', downsample(decomposition_data, 'data', 'trend'), x='data:T', y='trend', y_title='Tendência', color='darkgreen')
                     st.subheader("Sazonalidade")
-                    st.altair_chart(seasonal_chart, use_container_width=True)
+                    show_chart('line', downsample(decomposition_data, 'data', 'seasonal'), x='data:T', y='seasonal', y_title='Sazonalidade', color='seagreen')
                     st.subheader("Ruído")
-                    st.altair_chart(residual_chart, use_container_width=True)
+                    show_chart('line', downsample(decomposition_data, 'data', 'residual'), x='data:T', y='residual', y_title='Ruído', color='firebrick')
                 except Exception as e:
                     print("")
 
+            st.subheader("Brent vs. Dólar (DXY) e Juros Americanos de 10 Anos")
+            st.caption("Variações diárias: retorno logarítmico do Brent e do DXY e variação em pontos percentuais dos juros. Usa apenas o intervalo de datas dos filtros.")
+            col6, col7 = st.columns(2)
+
+            try:
+                # Séries alinhadas uma vez por versão dos dados; cada janela é calculada uma vez
+                analytics = cross_asset_analytics(ipea_df, market_data.get())
+                rolling_stats = analytics.rolling(correlation_window, start_date, end_date)
+
+                with col6:
+                    st.markdown(f"**Correlação Móvel com o Brent ({correlation_window} dias)**")
+                    show_chart('multi_line', rolling_chart_data(rolling_stats, 'corr'), x='data:T', y='valor:Q', series='ativo:N',
+                               y_title='Correlação', y_domain=(-1, 1))
+                with col7:
+                    st.markdown(f"**Beta Móvel do Brent ({correlation_window} dias)**")
+                    show_chart('multi_line', rolling_chart_data(rolling_stats, 'beta'), x='data:T', y='valor:Q', series='ativo:N',
+                               y_title='Beta (sensibilidade do Brent)')
+                with col6:
+                    st.markdown("**Correlação Cruzada por Defasagem**")
+                    show_chart('lag_bars', analytics.lead_lag(start_date, end_date, max_lag))
+            except Exception as e:
+                st.error(f"Erro ao gerar as correlações com o DXY e os juros: {e}")
+
 # Tab: Modelo Machine Learning
-with tabs[3]:
+def render_model():
     st.header("""Modelo Machine Learning""")
-    st.write("""Demonstração prática do modelo Prophet, treinado com dados históricos até 24/07/2024.""")
-
-    max_date = st.date_input('Selecione a data limite para as previsões', min_value=pd.to_datetime('2024-07-25'))
+    model_cutoff = model.cutoff()
+    st.write(f"""Demonstração prática do modelo Prophet, treinado com dados históricos até {model_cutoff.strftime('%d/%m/%Y')}.""")
+
+    model_stats = model.load_stats()
+    model_size = model_stats.size_bytes if model_stats.memory_bytes is None else model_stats.memory_bytes
+    st.caption(f"Modelo carregado em {model_stats.load_seconds:.2f}s ({model_size / 1024 ** 2:.1f} MB {'no disco' if model_stats.memory_bytes is None else 'em memória'}), compartilhado entre as sessões.")
+
+    # Resultado do backtesting com origem móvel (gerado por backtest.py)
+    backtest_results = load_backtest_results()
+    if backtest_results is not None:
+        with st.expander("Backtesting com origem móvel"):
+            overall = backtest_results[backtest_results['cutoff'].isna()].iloc[0]
+            st.write(f"Média de {len(backtest_results) - 1} cortes com {HORIZON_DAYS} dias de validação cada:")
+            st.write(f"MAE: {overall['mae']:.2f} | RMSE: {overall['rmse']:.2f} | WMAPE: {overall['wmape']:.2f}%")
+            st.dataframe(backtest_results.dropna(subset=['cutoff']), hide_index=True)
+
+    # Após um retreino o corte avança: uma data guardada (ou hoje) anterior ao novo mínimo
+    # derrubaria o date_input, então a escolha antiga é descartada e o valor vai para o mínimo
+    min_forecast_date = (model_cutoff + pd.Timedelta(days=1)).date()
+    if 'forecast_date' in st.session_state and st.session_state['forecast_date'] < min_forecast_date:
+        del st.session_state['forecast_date']
+        st.session_state.pop('last_forecast', None)
+    default_date = st.session_state.get('forecast_date', max(min_forecast_date, pd.Timestamp.today().date()))
+    max_date = st.date_input('Selecione a data limite para as previsões', value=default_date, min_value=min_forecast_date)
     
-    if end_date:
-        if st.button(label='Fazer previsão'):
-
-            prediction_df, data_range = model.make_df_and_predict(max_date=max_date)
-
-            st.write("Previsão do preço em US$ para os próximos {} dias:".format(data_range))
-
-            col1, col2 = st.columns([1,3])
-            with col1:
-                
-                st.subheader("Previsões Geradas")
-                st.write(prediction_df[['ds', 'yhat']])
-
-            with col2:
-
-
-                marker_date = '2024-07-24'
-
-                line_chart = alt.Chart(prediction_df.reset_index()).mark_line().encode(
-                    x=alt.X('ds:T', title='yhat', axis=alt.Axis(format='%d/%m/%Y', tickCount='day')),
-                    y=alt.Y('yhat:Q', title='Preço Previsto (USD)') 
-                ).properties(
-                    width=700,
-                    height=400
-                )
-
-                marker = alt.Chart(pd.DataFrame({'ds': [marker_date]})).mark_rule(color='red').encode(
-                    x='ds:T'
-                )
-
-                marker_text = alt.Chart(pd.DataFrame({'ds': [marker_date], 'yhat': [prediction_df.loc[prediction_df['ds'] == marker_date, 'yhat'].values[0]]})).mark_text(
-                    align='right',
-                    baseline='bottom',
-                    color='white',
-                    fontSize=12
-                ).encode(
-                    x='ds:T',
-                    y=alt.Y('yhat:Q'),
-                    text=alt.value('Limite dos Dados de Treino')
-                )
-
-                final_chart = line_chart + marker + marker_text
-
-                st.subheader("Visualização gráfica das previsões geradas.")
-                st.altair_chart(final_chart, use_container_width=True)
+    if st.button(label='Fazer previsão'):
+        st.session_state['forecast_date'] = max_date
+
+    if 'forecast_date' in st.session_state:
+        # A aba exibe apenas o yhat: modo pontual, sem simular os intervalos de incerteza
+        forecast = forecast_worker.submit_forecast(st.session_state['forecast_date'], history_tail=HISTORY_TAIL_DAYS, uncertainty_samples=0)
+
+        if forecast.done():
+            try:
+                st.session_state['last_forecast'] = forecast.result()
+                render_forecast(*st.session_state['last_forecast'], model_cutoff)
+            except Exception as e:
+                st.error(f"Erro ao gerar a previsão: {e}")
+        else:
+            wait_for_forecast(forecast)
+            if 'last_forecast' in st.session_state:
+                render_forecast(*st.session_state['last_forecast'], model_cutoff)
+
+
+TABS = {
+    "Introdução": render_intro,
+    "Relatório": render_report,
+    "Dashboard": render_dashboard,
+    "Modelo Machine Learning": render_model,
+}
+
+# Navegação entre as abas: diferente do st.tabs, executa apenas o corpo da aba selecionada
+active_tab = st.radio("Aba", list(TABS), horizontal=True, label_visibility="collapsed", key="active_tab")
+with recorder.span(f"tab.{active_tab}"):
+    TABS[active_tab]()
+
+recorder.end_rerun()
+
+# Painel de administração opcional (ADMIN_PANEL=1 e ?admin=1): p50/p95 recentes de cada etapa e estado dos caches
+if ADMIN_PANEL and st.query_params.get("admin") == "1":
+    with st.sidebar:
+        st.subheader("Desempenho por etapa")
+        st.dataframe(recorder.summary().round(2), hide_index=True)
+        chart_stats = chart_cache.stats()
+        st.caption(f"Cache de gráficos: {chart_stats['hits']} acertos, {chart_stats['misses']} faltas ({chart_stats['hit_rate']:.0%}), {chart_stats['nbytes'] / 1024 ** 2:.1f} MB")
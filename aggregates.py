@@ -0,0 +1,104 @@
+import threading
+import numpy as np
+import pandas as pd
+from cache import fingerprint
+
+
+class MonthlyCube:
+    # Agregados mensais (soma, contagem e soma dos quadrados) da série diária de preços.
+    # Médias anuais, desvio padrão mensal e volatilidade móvel para qualquer combinação de
+    # datas, anos e meses saem da combinação desses agregados, sem varrer a série diária.
+    # Só os meses cortados no meio pelas datas de início/fim são recalculados a partir dos dias.
+    def __init__(self, series) -> None:
+        self.series = series.dropna().sort_index()
+        by_month = self.series.index.to_period('M')
+        values = self.series.to_numpy(dtype='float64')
+
+        grouped = pd.DataFrame({'sum': values, 'sumsq': values ** 2, 'count': 1}, index=by_month).groupby(level=0).sum()
+        self.months = grouped.index
+        self.sum = grouped['sum'].to_numpy()
+        self.sumsq = grouped['sumsq'].to_numpy()
+        self.count = grouped['count'].to_numpy()
+
+    def select(self, start_date, end_date, years=None, months=None):
+        # Agregados dos meses entre start_date e end_date; meses fora dos filtros ficam com contagem zero
+        start_date = pd.to_datetime(start_date)
+        end_date = pd.to_datetime(end_date)
+        lo = self.months.searchsorted(start_date.to_period('M'))
+        hi = self.months.searchsorted(end_date.to_period('M'), side='right')
+
+        selected = self.months[lo:hi]
+        sums = self.sum[lo:hi].copy()
+        sumsqs = self.sumsq[lo:hi].copy()
+        counts = self.count[lo:hi].copy()
+
+        # Meses parcialmente cobertos pelo intervalo de datas
+        for i in {0, len(selected) - 1} if len(selected) else ():
+            month_start = selected[i].start_time
+            month_end = selected[i].end_time.normalize()
+            if start_date > month_start or end_date < month_end:
+                days = self.series.loc[max(start_date, month_start):min(end_date, month_end)].to_numpy(dtype='float64')
+                sums[i], sumsqs[i], counts[i] = days.sum(), (days ** 2).sum(), len(days)
+
+        mask = np.ones(len(selected), dtype=bool)
+        if years is not None:
+            mask &= np.isin(selected.year, list(years))
+        if months is not None:
+            mask &= np.isin(selected.month, list(months))
+        counts[~mask] = 0
+        sums[~mask] = 0.0
+        sumsqs[~mask] = 0.0
+
+        # Como o resample, o resultado vai do primeiro ao último mês com dados
+        filled = np.flatnonzero(counts)
+        if len(filled) == 0:
+            return selected[:0], sums[:0], sumsqs[:0], counts[:0]
+        keep = slice(filled[0], filled[-1] + 1)
+        return selected[keep], sums[keep], sumsqs[keep], counts[keep]
+
+    def monthly_std(self, start_date, end_date, years=None, months=None):
+        # Equivale a filtered_data['preco_bpd_US'].resample('ME').std().reset_index()
+        selected, sums, sumsqs, counts = self.select(start_date, end_date, years, months)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (sumsqs - sums ** 2 / counts) / (counts - 1)
+        std = np.sqrt(np.clip(variance, 0, None))
+        std[counts < 2] = np.nan
+
+        return pd.DataFrame({
+            'data': selected.to_timestamp(how='end').normalize(),
+            'preco_bpd_US': std,
+        })
+
+    def annual_mean(self, start_date, end_date, years=None, months=None):
+        # Equivale a filtered_data[['preco_bpd_US']].resample('YE').mean().reset_index()
+        selected, sums, _, counts = self.select(start_date, end_date, years, months)
+        if len(selected) == 0:
+            return pd.DataFrame({'data': pd.DatetimeIndex([]), 'preco_bpd_US': np.array([])})
+
+        first_year = selected.year.min()
+        offsets = (selected.year - first_year).to_numpy()
+        year_sums = np.bincount(offsets, weights=sums)
+        year_counts = np.bincount(offsets, weights=counts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = year_sums / year_counts
+
+        return pd.DataFrame({
+            'data': pd.to_datetime([f"{first_year + i}-12-31" for i in range(len(means))]),
+            'preco_bpd_US': means,
+        })
+
+
+# Cubos já montados, por fingerprint da série (um por versão dos dados)
+_cubes = {}
+_cubes_lock = threading.Lock()
+
+
+def monthly_cube(series):
+    key = fingerprint(series)
+    with _cubes_lock:
+        cube = _cubes.get(key)
+        if cube is None:
+            # Guarda apenas o cubo da versão mais recente dos dados
+            _cubes.clear()
+            cube = _cubes[key] = MonthlyCube(series)
+    return cube
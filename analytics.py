@@ -0,0 +1,149 @@
+import threading
+import numpy as np
+import pandas as pd
+from cache import LRUCache, fingerprint
+from instrumentation import recorder
+
+# Séries comparadas com o Brent e o nome usado nas colunas dos resultados
+ASSETS = {
+    'indice_dolar_eua_dxy': 'dxy',
+    'tx_juros_eua': 'juros_10a',
+}
+LABELS = {
+    'dxy': 'Dólar (DXY)',
+    'juros_10a': 'Juros EUA 10 anos',
+}
+
+
+def rolling_sums(values, window):
+    # Soma móvel de cada coluna em O(n) com somas acumuladas; linha i = soma de [i, i + window)
+    cs = np.concatenate((np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)))
+    return cs[window:] - cs[:-window]
+
+
+def cross_correlation(x, y, max_lag):
+    # Correlação entre x[t] e y[t - lag] para lag em [-max_lag, max_lag]: lag > 0 quer dizer
+    # que y antecede x. Cada defasagem é uma correlação de Pearson sobre a sobreposição das séries.
+    lags = np.arange(-max_lag, max_lag + 1)
+    n = len(x)
+    result = np.full(len(lags), np.nan)
+    for i, lag in enumerate(lags):
+        if lag >= 0:
+            a, b = x[lag:], y[:n - lag]
+        else:
+            a, b = x[:n + lag], y[-lag:]
+        if len(a) > 2:
+            a = a - a.mean()
+            b = b - b.mean()
+            denominator = np.sqrt((a * a).sum() * (b * b).sum())
+            result[i] = (a * b).sum() / denominator if denominator else np.nan
+    return lags, result
+
+
+class CrossAssetAnalytics:
+    # Brent, DXY e juros de 10 anos alinhados uma única vez no calendário comum (dias de
+    # pregão do DXY com preço do Brent). As estatísticas usam variações diárias: retorno
+    # logarítmico do Brent e do DXY e variação em pontos percentuais dos juros.
+    def __init__(self, ipea_df, market_df, max_bytes=32 * 1024 ** 2) -> None:
+        market = market_df[list(ASSETS)].dropna()
+        if getattr(market.index, 'tz', None) is not None:
+            market = market.tz_localize(None)
+        prices = ipea_df['preco_bpd_US'].dropna()
+        dates = market.index.intersection(prices.index).sort_values()
+
+        levels = np.column_stack([
+            prices.loc[dates].to_numpy(dtype='float64'),
+            market.loc[dates].to_numpy(dtype='float64'),
+        ])
+        changes = np.column_stack([
+            np.diff(np.log(levels[:, 0])),
+            np.diff(np.log(levels[:, 1])),
+            np.diff(levels[:, 2]),
+        ])
+        self.dates = dates[1:]
+        # Centralizadas: reduz o cancelamento numérico nas somas acumuladas
+        self.changes = changes - changes.mean(axis=0)
+        self.cache = LRUCache(max_bytes=max_bytes)
+        self._lock = threading.Lock()
+
+    def bounds(self, start_date, end_date):
+        lo = self.dates.searchsorted(pd.to_datetime(start_date), side='left')
+        hi = self.dates.searchsorted(pd.to_datetime(end_date), side='right')
+        return lo, hi
+
+    def rolling_stats(self, window):
+        # Correlação e beta móveis do Brent contra cada ativo na série inteira, para uma janela
+        n = len(self.changes)
+        columns = {}
+        if n >= window > 1:
+            brent = self.changes[:, 0]
+            others = self.changes[:, 1:]
+            s_b = rolling_sums(brent, window)
+            s_bb = rolling_sums(brent * brent, window)
+            s_x = rolling_sums(others, window)
+            s_xx = rolling_sums(others * others, window)
+            s_bx = rolling_sums(others * brent[:, None], window)
+
+            cov = window * s_bx - s_x * s_b[:, None]
+            var_b = window * s_bb - s_b * s_b
+            var_x = window * s_xx - s_x * s_x
+            with np.errstate(divide='ignore', invalid='ignore'):
+                corr = cov / np.sqrt(np.clip(var_x, 0, None) * np.clip(var_b, 0, None)[:, None])
+                beta = cov / var_x
+
+            for i, name in enumerate(ASSETS.values()):
+                columns[f'corr_{name}'] = np.clip(corr[:, i], -1, 1)
+                columns[f'beta_{name}'] = beta[:, i]
+            index = self.dates[window - 1:]
+        else:
+            index = self.dates[:0]
+            for name in ASSETS.values():
+                columns[f'corr_{name}'] = columns[f'beta_{name}'] = np.array([])
+
+        return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name='data'))
+
+    def rolling(self, window, start_date, end_date):
+        # Estatísticas das janelas que terminam entre start_date e end_date: a série inteira de
+        # cada janela é calculada uma vez e os intervalos são só recortes dela
+        key = ('rolling', window)
+        with self._lock:
+            stats = self.cache.get(key)
+            if stats is None:
+                with recorder.span('analytics.rolling', rows=len(self.changes)):
+                    stats = self.cache.set(key, self.rolling_stats(window))
+        lo = stats.index.searchsorted(pd.to_datetime(start_date), side='left')
+        hi = stats.index.searchsorted(pd.to_datetime(end_date), side='right')
+        return stats.iloc[lo:hi]
+
+    def lead_lag(self, start_date, end_date, max_lag=20):
+        # Correlação cruzada do Brent com cada ativo dentro do intervalo, por defasagem (dias de pregão)
+        lo, hi = self.bounds(start_date, end_date)
+        key = ('lead_lag', lo, hi, max_lag)
+        with self._lock:
+            result = self.cache.get(key)
+            if result is None:
+                with recorder.span('analytics.lead_lag', rows=int(hi - lo)):
+                    changes = self.changes[lo:hi]
+                    frames = []
+                    for i, name in enumerate(ASSETS.values()):
+                        lags, corr = cross_correlation(changes[:, 0], changes[:, i + 1], max_lag)
+                        frames.append(pd.DataFrame({'defasagem': lags, 'correlacao': corr, 'ativo': LABELS[name]}))
+                    result = self.cache.set(key, pd.concat(frames, ignore_index=True))
+        return result
+
+
+# Análises já montadas, por versão dos dados de preços e de mercado
+_analytics = {}
+_analytics_lock = threading.Lock()
+
+
+def cross_asset_analytics(ipea_df, market_df):
+    key = (fingerprint(ipea_df['preco_bpd_US']),) + tuple(fingerprint(market_df[column]) for column in ASSETS)
+    with _analytics_lock:
+        analytics = _analytics.get(key)
+        if analytics is None:
+            # Guarda apenas a análise da versão mais recente dos dados
+            _analytics.clear()
+            with recorder.span('analytics.align', rows=len(market_df)):
+                analytics = _analytics[key] = CrossAssetAnalytics(ipea_df, market_df)
+    return analytics
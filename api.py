@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import pandas as pd
+import tornado.web
+from cache import LRUCache, fingerprint
+from class_prophet import Prophet_model, FORECAST_TABLE_END
+from database import BigQuery
+from instrumentation import recorder
+from timeseries import time_series, COMPACT_MODE
+from worker import forecast_worker
+
+# API HTTP assíncrona com as previsões do Prophet e a série tratada do IPEA, servida em uma
+# porta própria ao lado do Streamlit. Usa os mesmos caches do processo (modelo, previsões e
+# dados) e responde 304 quando o If-None-Match bate com o ETag, sem gerar o corpo de novo.
+# Uso: python api.py [porta] [--stub]   (--stub: série sintética, sem BigQuery, para testes de carga)
+API_ENABLED = os.environ.get("API_ENABLED", "0") == "1"
+API_PORT = int(os.environ.get("API_PORT", 8502))
+API_ADDRESS = os.environ.get("API_ADDRESS", "127.0.0.1")
+
+# Limites dos parâmetros da previsão: cada (samples, seed) distinto guarda um histórico em cache
+API_MAX_SAMPLES = int(os.environ.get("API_MAX_SAMPLES", 1000))
+MAX_SEED = 2 ** 32 - 1
+# Última data aceita em end: por padrão, o fim do horizonte da tabela de previsões
+API_MAX_END = pd.Timestamp(os.environ.get("API_MAX_END", FORECAST_TABLE_END))
+
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+# Corpos já serializados, por ETag
+_bodies = LRUCache(max_bytes=64 * 1024 ** 2, sizeof=len)
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def to_json(df, metadata):
+    # Formato colunar: datas em ISO e uma lista de valores por coluna
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[column] = values.dt.strftime('%Y-%m-%d').tolist()
+        else:
+            # NaN não é JSON válido: vira null
+            columns[column] = [None if value != value else value for value in values.astype('float64').tolist()]
+    return json.dumps({**metadata, 'columns': columns}).encode()
+
+
+def to_arrow(df, metadata):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **{k.encode(): str(v).encode() for k, v in metadata.items()}})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class ApiHandler(tornado.web.RequestHandler):
+    # Pedidos idênticos em andamento compartilham a mesma serialização
+    inflight = {}
+
+    def initialize(self, data_source, model_factory, worker):
+        self.data_source = data_source
+        self.model_factory = model_factory
+        self.worker = worker
+
+    def output_format(self):
+        fmt = self.get_query_argument('format', None)
+        if fmt is None:
+            fmt = 'arrow' if ARROW_CONTENT_TYPE in self.request.headers.get('Accept', '') else 'json'
+        if fmt not in ('json', 'arrow'):
+            raise tornado.web.HTTPError(400, "format deve ser 'json' ou 'arrow'")
+        return fmt
+
+    def date_argument(self, name, default=None):
+        value = self.get_query_argument(name, None)
+        if value is None:
+            if default is None:
+                raise tornado.web.HTTPError(400, f"Parâmetro obrigatório: {name}")
+            return default
+        try:
+            return pd.Timestamp(value).normalize()
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"Data inválida em {name}: {value}")
+
+    def int_argument(self, name, default, minimum=None, maximum=None):
+        value = self.get_query_argument(name, None)
+        try:
+            value = default if value is None else int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, f"Inteiro inválido em {name}: {value}")
+        if minimum is not None and value < minimum:
+            raise tornado.web.HTTPError(400, f"{name} deve ser maior ou igual a {minimum}")
+        if maximum is not None and value > maximum:
+            raise tornado.web.HTTPError(400, f"{name} deve ser no máximo {maximum}")
+        return value
+
+    def not_modified(self, etag):
+        # Com o ETag definido antes do corpo, um If-None-Match igual encerra o pedido com 304
+        self.set_header('Etag', etag)
+        self.set_header('Cache-Control', 'no-cache')
+        if self.check_etag_header():
+            self.set_status(304)
+            return True
+        return False
+
+    async def body(self, etag, build):
+        body = _bodies.get(etag)
+        if body is not None:
+            return body
+
+        task = self.inflight.get(etag)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.get_running_loop().run_in_executor(None, build))
+            self.inflight[etag] = task
+            task.add_done_callback(lambda _: self.inflight.pop(etag, None))
+        body = await task
+        return _bodies.set(etag, body)
+
+    def send(self, body, fmt):
+        self.set_header('Content-Type', ARROW_CONTENT_TYPE if fmt == 'arrow' else 'application/json')
+        self.finish(body)
+
+    def write_error(self, status_code, **kwargs):
+        # Erros de validação levam a mensagem do HTTPError; os demais, só o status
+        error = kwargs.get('exc_info', (None, None, None))[1]
+        message = error.log_message if isinstance(error, tornado.web.HTTPError) and error.log_message else self._reason
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({'error': message}))
+
+
+class ForecastHandler(ApiHandler):
+    # GET /api/forecast?end=2025-12-31 (até API_MAX_END)[&history_tail=90][&samples=0..API_MAX_SAMPLES][&seed=0][&format=json|arrow]
+    async def get(self):
+        with recorder.span('api.forecast') as span:
+            fmt = self.output_format()
+            end = self.date_argument('end')
+            if end > API_MAX_END:
+                raise tornado.web.HTTPError(400, f"end deve ser no máximo {API_MAX_END.date()}")
+            history_tail = self.int_argument('history_tail', 0, minimum=0)
+            samples = self.int_argument('samples', 0, minimum=0, maximum=API_MAX_SAMPLES)
+            # Intervalos sempre sorteados com semente: o mesmo pedido gera o mesmo corpo (e ETag)
+            seed = self.int_argument('seed', 0, minimum=0, maximum=MAX_SEED) if samples else None
+
+            loop = asyncio.get_running_loop()
+            model = self.model_factory()
+            sha256 = await loop.run_in_executor(None, model.fingerprint)
+            cutoff = model.cutoff()
+            if end < cutoff:
+                raise tornado.web.HTTPError(400, f"end deve ser posterior a {cutoff.date()}")
+
+            etag = make_etag('forecast', sha256, end, history_tail, samples, seed, fmt)
+            if self.not_modified(etag):
+                return
+
+            # O worker junta pedidos iguais (inclusive os da aba Modelo, com history_tail=90) em
+            # uma única previsão; só os parâmetros usados entram no pedido, como na aba
+            options = {'history_tail': history_tail, 'uncertainty_samples': samples}
+            if not history_tail:
+                options['include_history'] = False
+            if seed is not None:
+                options['seed'] = seed
+            future = await loop.run_in_executor(None, lambda: self.worker.submit_forecast(end, **options))
+            df_forecast, data_range = await asyncio.wrap_future(future)
+
+            columns = ['ds', 'yhat', 'yhat_lower', 'yhat_upper'] if samples else ['ds', 'yhat']
+            metadata = {'model_sha256': sha256, 'cutoff': str(cutoff.date()), 'data_range': data_range}
+            serialize = to_arrow if fmt == 'arrow' else to_json
+            body = await self.body(etag, lambda: serialize(df_forecast[columns].reset_index(drop=True), metadata))
+            span['rows'] = len(df_forecast)
+            self.send(body, fmt)
+
+
+class SeriesHandler(ApiHandler):
+    # GET /api/series[?start=2020-01-01][&end=2024-12-31][&format=json|arrow]
+    async def get(self):
+        with recorder.span('api.series') as span:
+            fmt = self.output_format()
+            loop = asyncio.get_running_loop()
+            ipea_df, _ = await loop.run_in_executor(None, lambda: self.data_source().create_dfs())
+            ts = time_series(ipea_df, compact=COMPACT_MODE, dropna='preco_bpd_US')
+
+            start = self.date_argument('start', ts.df.index.min())
+            end = self.date_argument('end', ts.df.index.max())
+            etag = make_etag('series', fingerprint(ts.df['preco_bpd_US']), start, end, fmt)
+            if self.not_modified(etag):
+                return
+
+            def build():
+                selected = ts.range(start, end)[['preco_bpd_US']].rename_axis('data').reset_index()
+                return (to_arrow if fmt == 'arrow' else to_json)(selected, {'start': str(start.date()), 'end': str(end.date())})
+
+            body = await self.body(etag, build)
+            lo, hi = ts.bounds(start, end)
+            span['rows'] = int(hi - lo)
+            self.send(body, fmt)
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.finish({'status': 'ok'})
+
+
+def make_app(data_source=BigQuery, model_factory=Prophet_model, worker=forecast_worker):
+    options = {'data_source': data_source, 'model_factory': model_factory, 'worker': worker}
+    return tornado.web.Application([
+        (r"/api/forecast", ForecastHandler, options),
+        (r"/api/series", SeriesHandler, options),
+        (r"/api/health", HealthHandler),
+    ])
+
+
+async def serve(port=API_PORT, address=API_ADDRESS, **options):
+    make_app(**options).listen(port, address)
+    await asyncio.Event().wait()
+
+
+# Servidor iniciado uma única vez por processo, em uma thread com o seu próprio event loop
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_api(port=API_PORT, address=API_ADDRESS, **options):
+    global _thread
+
+    def run():
+        try:
+            asyncio.run(serve(port, address, **options))
+        except Exception as e:
+            print(f"API: falha ao servir em {address}:{port}: {e}")
+
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=run, name="forecast-api", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def stub_source(years=5):
+    # Fonte de dados sintética com cache próprio, sem BigQuery nem snapshots em disco
+    import functools
+    import tempfile
+    from cache import DataCache
+    from fixtures import FakeClient
+    from snapshot import SnapshotStore
+
+    return functools.partial(BigQuery, client=FakeClient(years), cache=DataCache(), incremental=False,
+                             snapshots=SnapshotStore(tempfile.mkdtemp()), offline=False)
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    port = int(args[0]) if args else API_PORT
+    options = {'data_source': stub_source()} if '--stub' in sys.argv else {}
+    print(f"API em http://{API_ADDRESS}:{port}/api/")
+    asyncio.run(serve(port, API_ADDRESS, **options))
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+# Backtesting com origem móvel: o Prophet é reajustado em vários cortes e avaliado
+# nos dias seguintes a cada corte, com as mesmas métricas do README (MAE, RMSE, WMAPE)
+
+BACKTEST_DIR = os.environ.get("BACKTEST_DIR", "backtest")
+RESULTS_PATH = os.environ.get("BACKTEST_RESULTS", "backtest_results.parquet")
+
+# Mesmo horizonte de validação do treino original (24/07/2024 a 21/10/2024)
+HORIZON_DAYS = 90
+STEP_DAYS = 30
+INITIAL_DAYS = 3 * 365
+
+
+def to_prophet_frame(ipea_df):
+    df_base = ipea_df[['preco_bpd_US']].dropna().reset_index()
+    return df_base.rename(columns={'data': 'ds', 'preco_bpd_US': 'y'})
+
+
+def data_hash(df_base):
+    hashed = pd.util.hash_pandas_object(df_base[['ds', 'y']], index=False).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()[:16]
+
+
+def make_cutoffs(df_base, initial_days=INITIAL_DAYS, step_days=STEP_DAYS, horizon_days=HORIZON_DAYS):
+    first = df_base['ds'].min() + pd.Timedelta(days=initial_days)
+    last = df_base['ds'].max() - pd.Timedelta(days=horizon_days)
+    if first > last:
+        return []
+    return list(pd.date_range(first, last, freq=f'{step_days}D'))
+
+
+def fold_rows(df_base, cutoff, horizon_days):
+    # Linhas usadas por um corte: o treino (antes do corte) e a validação (horizonte seguinte)
+    return df_base[df_base['ds'] < cutoff + pd.Timedelta(days=horizon_days)]
+
+
+def fold_name(rows, cutoff):
+    # Novos dias depois do horizonte não mudam o nome: o corte continua valendo
+    return f"{cutoff.strftime('%Y-%m-%d')}_{data_hash(rows)}"
+
+
+def fit_fold(rows, cutoff, fold_dir, name):
+    # Executado em um processo do pool; grava o ajuste e as previsões do corte em disco
+    import joblib
+    from prophet import Prophet
+
+    treino = rows[rows['ds'] < cutoff]
+    valid = rows[rows['ds'] >= cutoff]
+
+    prophet_object = Prophet(interval_width=0.9, uncertainty_samples=0)
+    prophet_object.fit(treino)
+    df_forecast = prophet_object.predict(valid[['ds']])
+
+    fold = valid.merge(df_forecast[['ds', 'yhat']], on='ds', how='left')
+    fold['cutoff'] = cutoff
+
+    # Escreve em arquivos temporários e renomeia: um corte só conta como feito quando completo
+    model_path = os.path.join(fold_dir, f"{name}.pkl")
+    fold_path = os.path.join(fold_dir, f"{name}.parquet")
+    joblib.dump(prophet_object, model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    fold.to_parquet(fold_path + ".tmp", index=False)
+    os.replace(fold_path + ".tmp", fold_path)
+
+    return fold_path
+
+
+def compute_metrics(folds):
+    # Métricas de todos os cortes de uma vez, agregadas por corte com bincount
+    cutoffs, fold_ids = np.unique(folds['cutoff'].values, return_inverse=True)
+    y = folds['y'].to_numpy(dtype='float64')
+    error = np.abs(y - folds['yhat'].to_numpy(dtype='float64'))
+
+    count = np.bincount(fold_ids)
+    abs_sum = np.bincount(fold_ids, weights=error)
+    sq_sum = np.bincount(fold_ids, weights=error ** 2)
+    y_sum = np.bincount(fold_ids, weights=y)
+
+    results = pd.DataFrame({
+        'cutoff': cutoffs,
+        'dias': count,
+        'mae': abs_sum / count,
+        'rmse': np.sqrt(sq_sum / count),
+        'wmape': abs_sum / y_sum * 100,
+    })
+
+    overall = pd.DataFrame({
+        'cutoff': [pd.NaT],
+        'dias': [count.sum()],
+        'mae': [error.mean()],
+        'rmse': [np.sqrt((error ** 2).mean())],
+        'wmape': [error.sum() / y.sum() * 100],
+    })
+    return pd.concat([results, overall], ignore_index=True)
+
+
+def run_backtest(df_base, cutoffs=None, horizon_days=HORIZON_DAYS, max_workers=None,
+                 directory=BACKTEST_DIR, results_path=RESULTS_PATH):
+    cutoffs = make_cutoffs(df_base, horizon_days=horizon_days) if cutoffs is None else cutoffs
+    if not cutoffs:
+        raise ValueError("Série curta demais para o backtesting: nenhum corte possível")
+
+    # Cada corte fica em disco com o hash só das linhas que usa e não é refeito enquanto
+    # elas não mudarem, mesmo que a série ganhe dias novos
+    fold_dir = os.path.join(directory, f"h{horizon_days}")
+    os.makedirs(fold_dir, exist_ok=True)
+
+    fold_paths = {}
+    pending = {}
+    for cutoff in cutoffs:
+        rows = fold_rows(df_base, cutoff, horizon_days)
+        name = fold_name(rows, cutoff)
+        fold_paths[cutoff] = os.path.join(fold_dir, f"{name}.parquet")
+        if not os.path.exists(fold_paths[cutoff]):
+            pending[cutoff] = (rows, name)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            futures = {pool.submit(fit_fold, rows, cutoff, fold_dir, name): cutoff for cutoff, (rows, name) in pending.items()}
+            for future in as_completed(futures):
+                future.result()
+                print(f"Corte {futures[future]:%Y-%m-%d} concluído")
+
+    folds = pd.concat([pd.read_parquet(path) for path in fold_paths.values()], ignore_index=True)
+    results = compute_metrics(folds)
+    results.to_parquet(results_path, index=False)
+    return results
+
+
+def load_results(results_path=RESULTS_PATH):
+    if not os.path.exists(results_path):
+        return None
+    return pd.read_parquet(results_path)
+
+
+# Uso: python backtest.py [processos]
+if __name__ == "__main__":
+    from database import BigQuery
+
+    # Consulta o BigQuery: o snapshot da partida a quente pode estar desatualizado
+    ipea_df, _ = BigQuery().refresh_dfs()
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    results = run_backtest(to_prophet_frame(ipea_df), max_workers=max_workers)
+    print(results.to_string(index=False))
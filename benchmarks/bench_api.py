@@ -0,0 +1,51 @@
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Teste de carga da API (api.py): dispara pedidos concorrentes e mede a latência de cada um.
+# Com --etag, repete o ETag da primeira resposta no If-None-Match (custo de uma consulta repetida).
+# Uso: python api.py --stub   e, em outro terminal,
+#      python benchmarks/bench_api.py [url] [pedidos] [concorrência] [--etag]
+
+DEFAULT_URL = "http://127.0.0.1:8502/api/series"
+
+
+def fetch(url, headers):
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+            etag = response.headers.get('Etag')
+    except urllib.error.HTTPError as e:
+        status, etag = e.code, e.headers.get('Etag')
+    return status, time.perf_counter() - start, etag
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    url = args[0] if args else DEFAULT_URL
+    requests = int(args[1]) if len(args) > 1 else 1000
+    concurrency = int(args[2]) if len(args) > 2 else 32
+
+    headers = {}
+    if '--etag' in sys.argv:
+        _, _, etag = fetch(url, {})
+        headers['If-None-Match'] = etag
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, headers), range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([seconds for _, seconds, _ in results]) * 1000
+    print(f"{requests} pedidos, {concurrency} concorrentes, {elapsed:.2f} s ({requests / elapsed:.0f} pedidos/s)")
+    print(f"status: {dict(Counter(status for status, _, _ in results))}")
+    print(f"latência: p50 {statistics.median(latencies):.1f} ms | p95 {np.percentile(latencies, 95):.1f} ms | p99 {np.percentile(latencies, 99):.1f} ms")
@@ -0,0 +1,48 @@
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import LRUCache
+from class_prophet import Prophet_model
+from instrumentation import recorder
+
+# Spans desligados: os tempos medidos não incluem o registro das métricas
+recorder.enabled = False
+
+# Compara a latência do modo pontual (sem intervalos) com o modo com intervalos de incerteza
+# Uso: python benchmarks/bench_forecast.py [modelo.pkl]
+
+HORIZONS = ["2024-10-21", "2025-07-24", "2027-01-01", "2030-06-30"]
+MODES = {
+    "pontual": {"uncertainty_samples": 0},
+    "intervalos (200 amostras)": {"uncertainty_samples": 200, "seed": 42},
+    "intervalos (padrão do modelo)": {"seed": 42},
+}
+REPEAT = 5
+
+
+def bench(model, max_date, options):
+    timings = []
+    for _ in range(REPEAT):
+        # Cache vazio e sem tabela pré-calculada: mede apenas a previsão
+        model.forecasts = LRUCache()
+        start = time.perf_counter()
+        model.make_df_and_predict(max_date, include_history=False, **options)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "modelo_prophet.pkl"
+    # table_path vazio desativa a tabela pré-calculada
+    model = Prophet_model(model_path, table_path="")
+    model.model
+
+    for max_date in HORIZONS:
+        results = {name: bench(model, max_date, options) for name, options in MODES.items()}
+        point = results["pontual"]
+        for name, seconds in results.items():
+            print(f"{max_date}  {name:<30} {seconds * 1000:8.1f} ms  ({seconds / point:5.1f}x)")
@@ -0,0 +1,185 @@
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregates import MonthlyCube
+from cache import DataCache, LRUCache
+from database import BigQuery
+from decomposition import seasonal_decompose
+from fixtures import FakeClient
+from instrumentation import recorder
+from model_registry import ModelRegistry
+from snapshot import SnapshotStore
+from timeseries import TimeSeriesFrame
+
+# Spans desligados: os tempos medidos não incluem o registro das métricas
+recorder.enabled = False
+
+# Mede carga e preparo dos dados, decomposição, filtros do Dashboard e previsão, sem rede:
+# o BigQuery é substituído por um cliente falso que devolve uma série sintética.
+# Uso: python benchmarks/bench_suite.py [saida.json] [modelo.pkl]
+
+YEARS = [5, 10, 20, 40]
+HORIZONS = ["2024-10-21", "2025-07-24", "2027-01-01", "2030-06-30"]
+PERIODS = [12, 365]
+REPEAT = 7
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(fn, repeat=REPEAT):
+    # Latência de cada execução e pico de memória alocada em uma execução extra, à parte,
+    # para que o tracemalloc não distorça os tempos
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings) * 1000
+    return {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'min_ms': float(timings.min()),
+        'max_ms': float(timings.max()),
+        'peak_mb': peak / 1024 ** 2,
+        'repeat': repeat,
+    }
+
+
+def dashboard_filters(ts, cube, price_filter):
+    # Mesma sequência de filtros e agregações da aba Dashboard, com um ano e meses de fora
+    start_date, end_date = ts.df.index.min(), ts.df.index.max()
+    years = ts.years(start_date, end_date).tolist()[1:]
+    months = list(range(1, 12))
+
+    if price_filter:
+        filtered_data = ts.range(start_date, end_date)
+        low, high = filtered_data['preco_bpd_US'].quantile([0.1, 0.9])
+        filtered_data = filtered_data[(filtered_data['preco_bpd_US'] >= low) & (filtered_data['preco_bpd_US'] <= high)]
+        filtered_data = filtered_data[filtered_data.index.year.isin(years)]
+        filtered_data = filtered_data[filtered_data.index.month.isin(months)]
+        volatility = filtered_data['preco_bpd_US'].resample('ME').std().reset_index()
+        annual = filtered_data[['preco_bpd_US']].resample('YE').mean().reset_index()
+    else:
+        filtered_data = ts.select(start_date, end_date, years, months)
+        volatility = cube.monthly_std(start_date, end_date, years, months)
+        annual = cube.annual_mean(start_date, end_date, years, months)
+
+    volatility['preco_bpd_US'].rolling(window=3).mean()
+    return filtered_data, annual
+
+
+def bench_data(years, directory):
+    client = FakeClient(years, window_years=years)
+    results = {}
+
+    # Diretório de snapshots próprio para cada tamanho de série
+    loader = BigQuery(client=client, cache=DataCache(), incremental=False, snapshots=SnapshotStore(tempfile.mkdtemp(dir=directory)), offline=False)
+    results['prepare_data'] = measure(lambda: loader.prepare_data(client.df))
+
+    # Carga a frio: cache vazio e sem snapshot (consulta, preparo e gravação do snapshot)
+    def cold_load():
+        store = SnapshotStore(tempfile.mkdtemp(dir=directory))
+        BigQuery(client=client, cache=DataCache(), incremental=False, snapshots=store, offline=False).create_dfs()
+    results['create_dfs_cold'] = measure(cold_load)
+
+    # Partida a quente: apenas a leitura do snapshot em disco
+    ipea_df, merged_df = loader.create_dfs()
+    snapshot_dir = loader.snapshots.directory
+    results['create_dfs_snapshot'] = measure(
+        lambda: BigQuery(client=client, cache=DataCache(), snapshots=SnapshotStore(snapshot_dir), offline=True).create_dfs())
+
+    # Cache em memória válido: custo de cada rerun
+    results['create_dfs_cached'] = measure(loader.create_dfs)
+
+    series = ipea_df['preco_bpd_US'].dropna()
+    for period in PERIODS:
+        results[f'seasonal_decompose_{period}'] = measure(lambda: seasonal_decompose(series, period))
+
+    ts = TimeSeriesFrame(ipea_df, dropna='preco_bpd_US')
+    cube = MonthlyCube(series)
+    results['time_series_build'] = measure(lambda: TimeSeriesFrame(ipea_df, dropna='preco_bpd_US'))
+    results['monthly_cube_build'] = measure(lambda: MonthlyCube(series))
+    results['dashboard_filters'] = measure(lambda: dashboard_filters(ts, cube, price_filter=False))
+    results['dashboard_filters_price'] = measure(lambda: dashboard_filters(ts, cube, price_filter=True))
+    return {'rows': len(ipea_df), 'stages': results}
+
+
+def bench_model(model_path):
+    # O pickle do modelo importa o prophet ao ser carregado
+    if importlib.util.find_spec('prophet') is None:
+        return {'skipped': "prophet não está instalado"}
+    from class_prophet import Prophet_model
+    if not os.path.exists(model_path):
+        return {'skipped': f"modelo não encontrado: {model_path}"}
+
+    results = {}
+    # Registro novo a cada execução: mede a desserialização completa do arquivo
+    results['load'] = measure(lambda: Prophet_model(model_path, registry=ModelRegistry(), table_path="").model, repeat=3)
+
+    model = Prophet_model(model_path, table_path="")
+    model.model
+    for max_date in HORIZONS:
+        def forecast():
+            # Cache de previsões vazio: mede a previsão no modo usado pela aba Modelo
+            model.forecasts = LRUCache()
+            model.make_df_and_predict(max_date, history_tail=90, uncertainty_samples=0)
+        results[f'make_df_and_predict_{max_date}'] = measure(forecast, repeat=5)
+    return results
+
+
+def environment():
+    versions = {}
+    for name in ('numpy', 'pandas', 'pyarrow', 'prophet'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+    }
+
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    model_path = sys.argv[2] if len(sys.argv) > 2 else "modelo_prophet.pkl"
+
+    report = {'created_at': pd.Timestamp.now().isoformat(), 'environment': environment(), 'data': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for years in YEARS:
+            report['data'][str(years)] = result = bench_data(years, directory)
+            for stage, stats in result['stages'].items():
+                print(f"{years:>2} anos ({result['rows']:>6} linhas)  {stage:<26} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  pico {stats['peak_mb']:7.1f} MB")
+
+    report['model'] = model = bench_model(model_path)
+    for stage, stats in model.items():
+        if stage == 'skipped':
+            print(f"Modelo: {stats}")
+        else:
+            print(f"modelo  {stage:<36} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  pico {stats['peak_mb']:7.1f} MB")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {output}")
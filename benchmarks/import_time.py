@@ -0,0 +1,101 @@
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Relatório do tempo de importação (python -X importtime) dos módulos que o app importa na partida
+# Uso: python benchmarks/import_time.py [saida.json] [módulo ...]
+# Sem módulos, usa os imports de nível superior do Tech_Challenge_Phase_4.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(ROOT, "Tech_Challenge_Phase_4.py")
+REPEAT = 5
+TOP = 25
+
+
+def app_imports(path=APP_SCRIPT):
+    # Módulos importados no nível superior do script (os que pesam na partida do processo)
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def run_importtime(modules):
+    code = "; ".join(f"import {module}" for module in modules)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return wall, parse_importtime(result.stderr)
+
+
+def parse_importtime(stderr):
+    # Linhas no formato "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth,
+        })
+    return entries
+
+
+def by_package(entries):
+    # Soma do tempo próprio de cada módulo, agrupado pelo pacote de primeiro nível
+    totals = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + entry["self_ms"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else None
+    modules = sys.argv[2:] or app_imports()
+
+    # Processo novo a cada execução: mede a importação a frio (com o cache de bytecode já gerado)
+    runs = [run_importtime(modules) for _ in range(REPEAT)]
+    walls = [wall for wall, _ in runs]
+    entries = min(runs, key=lambda run: run[0])[1]
+
+    direct = {entry["module"]: entry["cumulative_ms"] for entry in entries if entry["depth"] == 0}
+    packages = by_package(entries)
+    total_ms = sum(entry["self_ms"] for entry in entries)
+
+    print(f"Módulos: {', '.join(modules)}")
+    print(f"Processo (mediana de {REPEAT}): {statistics.median(walls) * 1000:.0f} ms | importações: {total_ms:.0f} ms")
+    print("\nImports do script (acumulado):")
+    for module in modules:
+        print(f"  {module:<40} {direct.get(module, 0.0):8.1f} ms")
+    print(f"\nPacotes mais lentos (tempo próprio, top {TOP}):")
+    for package, ms in list(packages.items())[:TOP]:
+        print(f"  {package:<40} {ms:8.1f} ms")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({
+                "modules": modules,
+                "process_ms": [wall * 1000 for wall in walls],
+                "imports_ms": total_ms,
+                "direct_ms": direct,
+                "packages_ms": packages,
+                "entries": entries,
+            }, f, indent=2)
+        print(f"\nResultados salvos em {output}")
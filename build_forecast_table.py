@@ -0,0 +1,15 @@
+import sys
+from class_prophet import Prophet_model, FORECAST_TABLE_END, DEFAULT_MODEL_PATH
+from manifest import latest_model_path
+
+# Gera a tabela de previsões pré-calculadas usada por Prophet_model.make_df_and_predict
+# Uso: python build_forecast_table.py [modelo.pkl] [data_final]
+# Sem modelo.pkl, usa a versão mais recente gerada por train.py (ou o modelo original)
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else latest_model_path() or DEFAULT_MODEL_PATH
+    end_date = sys.argv[2] if len(sys.argv) > 2 else FORECAST_TABLE_END
+
+    model = Prophet_model(model_path)
+    table = model.build_forecast_table(end_date)
+
+    print(f"{len(table.df)} previsões até {end_date} salvas em {model.table_path}")
@@ -0,0 +1,139 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import time
+import pandas as pd
+
+_MISSING = object()
+
+
+class DataCache:
+    # Cache do processo, compartilhado entre todas as sessões do Streamlit.
+    # Cada chave expira após o TTL, e apenas uma carga por chave fica em andamento
+    # por vez (single-flight): as sessões concorrentes aguardam e reaproveitam o resultado.
+    def __init__(self, ttl=3600, clock=time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def peek(self, key, default=None, stale=False):
+        # stale=True devolve o valor mesmo que o TTL já tenha expirado
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if not stale and expires_at is not None and self._clock() >= expires_at:
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None or ttl <= 0 else self._clock() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+        return value
+
+    def get_or_load(self, key, loader, ttl=None):
+        return self.get_or_update(key, lambda previous: loader(), ttl)
+
+    def get_or_update(self, key, updater, ttl=None):
+        # updater recebe o valor expirado (ou None) e devolve o novo valor,
+        # o que permite atualizações incrementais em vez de recargas completas
+        value = self.peek(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._key_lock(key):
+            # Outra sessão pode ter carregado enquanto esperávamos o lock
+            value = self.peek(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            return self.set(key, updater(self.peek(key, stale=True)), ttl)
+
+    def update(self, key, updater, ttl=None):
+        # Atualiza a chave mesmo que ela ainda esteja válida
+        with self._key_lock(key):
+            return self.set(key, updater(self.peek(key, stale=True)), ttl)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class LRUCache:
+    # Cache LRU limitado pelo tamanho total em bytes dos valores guardados
+    def __init__(self, max_bytes=256 * 1024 ** 2, sizeof=frame_nbytes) -> None:
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            # Valores maiores que o limite não são guardados
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+        return value
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def fingerprint(series):
+    # Hash do índice e dos valores de uma Series, usado como chave de cache
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(series.index.asi8.tobytes() if hasattr(series.index, 'asi8') else series.index.values.tobytes())
+    digest.update(series.to_numpy(dtype='float64').tobytes())
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df):
+    # Hash das colunas, do índice e dos valores de todas as colunas do frame
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(tuple(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,122 @@
+import json
+from cache import LRUCache, frame_fingerprint
+from instrumentation import recorder
+
+
+# O altair só é importado quando algum spec precisa ser montado (falta no cache)
+def line_chart(data, x, y, y_title, color=None, x_title='Data', x_format='%Y-%m', tick_count='month', width=500, height=300):
+    import altair as alt
+
+    mark = alt.Chart(data).mark_line(color=color) if color else alt.Chart(data).mark_line()
+    return mark.encode(
+        x=alt.X(x, title=x_title, axis=alt.Axis(format=x_format, tickCount=tick_count)),
+        y=alt.Y(y, title=y_title)
+    ).properties(width=width, height=height)
+
+
+def annual_bar_chart(data, width=700, height=400):
+    import altair as alt
+
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X('year(data):T', title='Ano', axis=alt.Axis(labelAngle=0), bandPosition=0),
+        y=alt.Y('preco_bpd_US', title='Preço Médio por Barril (USD)')
+    ).properties(width=width, height=height)
+
+
+def annual_bar_years_chart(data, width=500, height=303):
+    import altair as alt
+
+    # Eixo ordinal com exatamente os anos presentes nos dados
+    years_in_data = data['data'].dt.year.unique()
+    return alt.Chart(data).mark_bar(color='steelblue').encode(
+        x=alt.X('year(data):O',
+                title='Ano',
+                axis=alt.Axis(labelAngle=0, labelAlign='center', labelOffset=10),
+                scale=alt.Scale(domain=list(years_in_data))),
+        y=alt.Y('preco_bpd_US', title='Preço Médio por Barril (USD)'),
+    ).properties(width=width, height=height)
+
+
+def consumption_price_chart(data, price_title='Preço Médio por Barril (USD)', width=500, height=302):
+    import altair as alt
+
+    consumption_chart = alt.Chart(data).mark_area(opacity=0.4, color='blue').encode(
+        x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('Consumo', title='Consumo (média Mi. barris p/ dia)', axis=alt.Axis(titleColor='blue'),
+                scale=alt.Scale(domain=[0, data['Consumo'].max()])),
+    ).properties(width=width, height=height)
+
+    price_chart = alt.Chart(data).mark_area(opacity=0.4, color='darkred').encode(
+        x=alt.X('year:O', title='Ano', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('preco_bpd_US', title=price_title, axis=alt.Axis(titleColor='darkred'),
+                scale=alt.Scale(domain=[0, data['preco_bpd_US'].max()])),
+    ).properties(width=width, height=height)
+
+    return alt.layer(consumption_chart, price_chart).resolve_scale(y='independent')
+
+
+def multi_line_chart(data, x, y, series, y_title, y_domain=None, x_title='Data', x_format='%Y-%m', width=500, height=300):
+    import altair as alt
+
+    # Dados no formato longo: uma linha por série, identificada pela coluna series
+    scale = alt.Scale(domain=list(y_domain)) if y_domain else alt.Undefined
+    return alt.Chart(data).mark_line().encode(
+        x=alt.X(x, title=x_title, axis=alt.Axis(format=x_format)),
+        y=alt.Y(y, title=y_title, scale=scale),
+        color=alt.Color(series, title=None, legend=alt.Legend(orient='bottom')),
+    ).properties(width=width, height=height)
+
+
+def lag_bar_chart(data, width=500, height=300):
+    import altair as alt
+
+    return alt.Chart(data).mark_bar().encode(
+        x=alt.X('defasagem:O', title='Defasagem (dias de pregão; positiva = ativo antecede o Brent)', axis=alt.Axis(labelAngle=0)),
+        xOffset='ativo:N',
+        y=alt.Y('correlacao:Q', title='Correlação com o Brent'),
+        color=alt.Color('ativo:N', title=None, legend=alt.Legend(orient='bottom')),
+    ).properties(width=width, height=height)
+
+
+# Tipos de gráfico disponíveis no cache de specs
+CHART_BUILDERS = {
+    'line': line_chart,
+    'annual_bar': annual_bar_chart,
+    'annual_bar_years': annual_bar_years_chart,
+    'consumption_price': consumption_price_chart,
+    'multi_line': multi_line_chart,
+    'lag_bars': lag_bar_chart,
+}
+
+
+def spec_nbytes(spec):
+    return len(json.dumps(spec, default=str))
+
+
+class ChartCache:
+    # Specs Vega-Lite prontos por (tipo do gráfico, fingerprint dos dados, parâmetros): montar
+    # os alt.Chart e serializar os dados para JSON acontece só na primeira renderização
+    def __init__(self, max_bytes=64 * 1024 ** 2) -> None:
+        self.cache = LRUCache(max_bytes=max_bytes, sizeof=spec_nbytes)
+
+    def spec(self, kind, data, **params):
+        key = (kind, frame_fingerprint(data), tuple(sorted(params.items())))
+        spec = self.cache.get(key)
+        if spec is None:
+            with recorder.span('chart.build', rows=len(data)):
+                spec = self.cache.set(key, CHART_BUILDERS[kind](data, **params).to_dict())
+        return spec
+
+    def stats(self):
+        requests = self.cache.hits + self.cache.misses
+        return {
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'hit_rate': self.cache.hits / requests if requests else 0.0,
+            'entries': len(self.cache),
+            'nbytes': self.cache.nbytes,
+        }
+
+
+# Cache compartilhado por todas as sessões do processo
+chart_cache = ChartCache()
@@ -1,23 +1,284 @@
-import joblib
+import copy
+import os
+import threading
+import numpy as np
 import pandas as pd
+from cache import LRUCache
+from model_registry import registry as _registry
+from instrumentation import recorder
+from manifest import read_manifest, latest_model_path
+
+# Limite de memória (em MB) das previsões guardadas em cache no processo
+FORECAST_CACHE_MB = int(os.environ.get("FORECAST_CACHE_MB", 256))
+
+# Previsões compartilhadas entre as sessões, por (fingerprint do modelo, data final)
+_forecasts = LRUCache(max_bytes=FORECAST_CACHE_MB * 1024 ** 2)
+
+# Início das previsões do modelo original, que não tem manifesto
+DEFAULT_CUTOFF = "2024-07-24"
+DEFAULT_MODEL_PATH = 'modelo_prophet.pkl'
+
+# Último dia da tabela de previsões pré-calculadas (mesmo horizonte do código de treino)
+FORECAST_TABLE_END = "2030-06-30"
+
+# Tabelas de previsão já lidas do disco, por caminho
+_tables = {}
+_tables_lock = threading.Lock()
+
+# Valores ajustados do período de treino, por (modelo, modo de amostragem), com limite de memória
+HISTORY_CACHE_MB = int(os.environ.get("HISTORY_CACHE_MB", 64))
+_histories = LRUCache(max_bytes=HISTORY_CACHE_MB * 1024 ** 2)
+_histories_lock = threading.Lock()
+
+# O Prophet sorteia os intervalos com o gerador global do NumPy
+_sampling_lock = threading.Lock()
+
+
+def predict(model, df, uncertainty_samples=None, seed=None):
+    # uncertainty_samples=0 prevê apenas o yhat, sem a simulação dos intervalos;
+    # None usa o valor do próprio modelo. Com seed o sorteio é reprodutível.
+    if uncertainty_samples is not None and uncertainty_samples != model.uncertainty_samples:
+        # Cópia rasa: compartilha os parâmetros, sem alterar o modelo usado pelas outras sessões
+        model = copy.copy(model)
+        model.uncertainty_samples = uncertainty_samples
+
+    if not model.uncertainty_samples:
+        return model.predict(df, vectorized=True)
+
+    # Toda simulação dos intervalos usa o lock: um sorteio sem semente em outra thread
+    # avançaria o gerador no meio de uma previsão com semente
+    with _sampling_lock:
+        if seed is None:
+            return model.predict(df, vectorized=True)
+        state = np.random.get_state()
+        np.random.seed(seed)
+        try:
+            return model.predict(df, vectorized=True)
+        finally:
+            np.random.set_state(state)
+
+
+class ForecastTable:
+    # Previsões do modelo congelado calculadas uma única vez, ordenadas por data,
+    # para responder qualquer horizonte com uma busca binária
+    COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+    def __init__(self, df, fingerprint) -> None:
+        self.df = df.reset_index(drop=True)
+        self.ds = self.df['ds'].values
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, model, fingerprint, end_date=FORECAST_TABLE_END):
+        periods = (pd.to_datetime(end_date) - model.history['ds'].max()).days
+        df_future = model.make_future_dataframe(periods=periods, freq='D')
+        df_forecast = predict(model, df_future)[cls.COLUMNS]
+        df_forecast = df_forecast.astype({'yhat': 'float32', 'yhat_lower': 'float32', 'yhat_upper': 'float32'})
+        return cls(df_forecast, fingerprint)
+
+    def save(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+        table = table.replace_schema_metadata({**table.schema.metadata, b'model_sha256': self.fingerprint.encode()})
+        pq.write_table(table, path)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, memory_map=True)
+        fingerprint = table.schema.metadata.get(b'model_sha256', b'').decode()
+        return cls(table.to_pandas(), fingerprint)
+
+    def covers(self, horizon_end):
+        return len(self.ds) > 0 and np.datetime64(horizon_end) <= self.ds[-1]
+
+    def slice(self, horizon_end):
+        stop = np.searchsorted(self.ds, np.datetime64(horizon_end), side='right')
+        return self.df.iloc[:stop]
+
 
 class Prophet_model:
-    def __init__(self, model_path='modelo_prophet.pkl'):
-        # Carrega o modelo salvo
-        self.model = joblib.load(model_path)
+    def __init__(self, model_path=None, registry=None, forecasts=None, table_path=None):
+        # Sem model_path, usa a versão mais recente gerada por train.py (ou o modelo original)
+        if model_path is None:
+            model_path = latest_model_path() or DEFAULT_MODEL_PATH
+        # O modelo é carregado uma única vez por processo pelo registro de modelos
+        self.model_path = model_path
+        self.table_path = os.path.splitext(model_path)[0] + '_forecast.parquet' if table_path is None else table_path
+        self.registry = _registry if registry is None else registry
+        self.forecasts = _forecasts if forecasts is None else forecasts
+
+    @property
+    def model(self):
+        # Recarrega automaticamente quando o arquivo do modelo muda
+        return self.registry.get(self.model_path)
 
-    def make_df_and_predict(self, max_date):
+    def load_stats(self):
+        return self.registry.entry(self.model_path)
 
-        start_date = "2024-07-24"
+    def fingerprint(self):
+        return self.load_stats().sha256
+
+    def cutoff(self):
+        # Primeiro dia após os dados de treino, registrado no manifesto do artefato
+        manifest = read_manifest(self.model_path)
+        return pd.to_datetime(DEFAULT_CUTOFF if manifest is None else manifest['cutoff'])
+
+    def forecast_table(self):
+        # Lê a tabela pré-calculada uma vez por processo (e de novo se o arquivo mudar)
+        if not os.path.exists(self.table_path):
+            return None
+        mtime = os.stat(self.table_path).st_mtime_ns
+
+        with _tables_lock:
+            cached = _tables.get(self.table_path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, ForecastTable.load(self.table_path))
+                _tables[self.table_path] = cached
+        return cached[1]
+
+    def build_forecast_table(self, end_date=FORECAST_TABLE_END):
+        entry = self.load_stats()
+        table = ForecastTable.build(entry.model, entry.sha256, end_date)
+        table.save(self.table_path)
+        return table
+
+    def history_forecast(self, entry, uncertainty_samples=None, seed=None):
+        # O histórico de treino não muda para um mesmo modelo: prevê uma única vez
+        key = (entry.sha256, uncertainty_samples, seed)
+        with _histories_lock:
+            df_history = _histories.get(key)
+            if df_history is None:
+                with recorder.span('model.predict_history', rows=len(entry.model.history)):
+                    df_history = predict(entry.model, entry.model.history[['ds']], uncertainty_samples, seed)
+                _histories.set(key, df_history)
+        return df_history
+
+    def make_df_and_predict(self, max_date, include_history=True, history_tail=None, uncertainty_samples=None, seed=None):
+        # include_history=False devolve apenas a janela futura; history_tail limita
+        # o histórico às últimas N linhas (contexto para o gráfico).
+        # uncertainty_samples=0 é o modo pontual (só yhat); N > 0 calcula os intervalos com N amostras.
+        if history_tail is not None and history_tail < 0:
+            raise ValueError("history_tail não pode ser negativo")
+
+        start_date = self.cutoff()
         end_date = max_date
 
         data_range = pd.date_range(start=start_date, end=end_date).size
 
-        df_future = self.model.make_future_dataframe(periods=data_range, freq='D')
-        
-        df_forecast = self.model.predict(df_future)
+        entry = self.load_stats()
+        model = entry.model
+
+        # Última data prevista: make_future_dataframe soma data_range dias ao fim do histórico
+        history_end = model.history['ds'].max()
+        horizon_end = history_end + pd.Timedelta(days=data_range)
+
+        # Dentro do horizonte pré-calculado a resposta é só um recorte da tabela, devolvido em
+        # float64 como no predict. O yhat não depende da amostragem, então o modo pontual usa
+        # ds/yhat da tabela com qualquer semente; os intervalos da tabela foram sorteados com a
+        # amostragem padrão do modelo, sem semente, e só atendem esse modo. A tabela traz apenas
+        # ForecastTable.COLUMNS (sem os componentes do Prophet); os demais modos passam pelo modelo.
+        table = self.forecast_table()
+        if uncertainty_samples == 0:
+            columns = ['ds', 'yhat']
+        elif uncertainty_samples is None and seed is None:
+            columns = ForecastTable.COLUMNS
+        else:
+            columns = None
+        if columns and table is not None and table.fingerprint == entry.sha256 and table.covers(horizon_end):
+            df_forecast = table.slice(horizon_end)[columns]
+            df_forecast = df_forecast.astype({column: 'float64' for column in columns[1:]})
+            start = df_forecast['ds'].searchsorted(history_end, side='right')
+            if include_history:
+                start = 0 if history_tail is None else max(start - history_tail, 0)
+            return df_forecast.iloc[start:], data_range
+
+        mode = (uncertainty_samples, seed)
+        key = (entry.sha256, mode, horizon_end)
+
+        df_forecast = self.forecasts.get(key)
+        if df_forecast is None and uncertainty_samples == 0:
+            # Só o modo pontual é determinístico dia a dia: com intervalos sorteados, o recorte
+            # de um horizonte maior daria valores diferentes dos de uma previsão com a mesma semente
+            df_forecast = self.slice_longer_forecast(entry.sha256, mode, horizon_end)
+
+        if df_forecast is None:
+            # Prevê somente os dias futuros; o histórico vem de history_forecast
+            df_future = model.make_future_dataframe(periods=data_range, freq='D', include_history=False)
 
+            with recorder.span('model.predict', rows=len(df_future)):
+                df_forecast = predict(model, df_future, uncertainty_samples, seed)
+
+        self.forecasts.set(key, df_forecast)
+
+        if include_history:
+            df_history = self.history_forecast(entry, uncertainty_samples, seed)
+            if history_tail is not None:
+                df_history = df_history.iloc[-history_tail:] if history_tail > 0 else df_history.iloc[:0]
+            df_forecast = pd.concat([df_history, df_forecast], ignore_index=True)
 
         return df_forecast, data_range
 
+    def predict_batch(self, requests, uncertainty_samples=None, seed=None):
+        # Várias janelas/cenários de uma vez: cada pedido é uma data final ou um dict com
+        # 'end', 'start' (padrão: dia seguinte ao fim do treino) e 'regressors' (cenário
+        # what-if com valores fixos para os regressores extras do modelo). Pedidos do mesmo
+        # cenário são previstos juntos, em um único predict sobre a união das datas.
+        model = self.model
+        first_day = model.history['ds'].max() + pd.Timedelta(days=1)
+
+        windows = []
+        for request in requests:
+            if not isinstance(request, dict):
+                request = {'end': request}
+            start = pd.to_datetime(request.get('start', first_day))
+            end = pd.to_datetime(request['end'])
+            regressors = request.get('regressors', {})
+            # Uma coluna que o modelo não conhece seria ignorada em silêncio pelo predict
+            unknown = sorted(set(regressors) - set(model.extra_regressors))
+            if unknown:
+                raise ValueError(f"Regressores desconhecidos pelo modelo: {', '.join(unknown)}")
+            scenario = tuple(sorted(regressors.items()))
+            windows.append((start, end, scenario))
+
+        results = [None] * len(windows)
+        for scenario in set(window[2] for window in windows):
+            positions = [i for i, window in enumerate(windows) if window[2] == scenario]
+
+            dates = np.unique(np.concatenate([
+                pd.date_range(windows[i][0], windows[i][1], freq='D').values for i in positions
+            ]))
+            df_future = pd.DataFrame({'ds': dates})
+            for name, value in scenario:
+                df_future[name] = value
+
+            df_forecast = predict(model, df_future, uncertainty_samples, seed)
+            ds = df_forecast['ds'].values
+
+            for i in positions:
+                start, end, _ = windows[i]
+                begin = np.searchsorted(ds, np.datetime64(start), side='left')
+                stop = np.searchsorted(ds, np.datetime64(end), side='right')
+                results[i] = df_forecast.iloc[begin:stop].reset_index(drop=True)
+
+        return results
+
+    def slice_longer_forecast(self, fingerprint, mode, horizon_end):
+        # Um horizonte menor é o prefixo de uma previsão pontual já calculada com horizonte maior
+        longer = [
+            end for model_hash, cached_mode, end in self.forecasts.keys()
+            if model_hash == fingerprint and cached_mode == mode and end > horizon_end
+        ]
+        if not longer:
+            return None
+
+        df_longer = self.forecasts.get((fingerprint, mode, min(longer)))
+        if df_longer is None:
+            return None
+
+        stop = df_longer['ds'].searchsorted(horizon_end, side='right')
+        return df_longer.iloc[:stop]
 
@@ -1,14 +1,38 @@
+import os
 import pandas as pd
-from google.cloud import bigquery
-import streamlit as st
-import json
+from cache import DataCache
+from snapshot import SnapshotStore, OFFLINE
+from instrumentation import recorder
+
+# Tempo (em segundos) que os dados do BigQuery ficam em cache no processo
+CACHE_TTL = int(os.environ.get("BIGQUERY_CACHE_TTL", 3600))
+CACHE_KEY = "ipea_dfs"
+SNAPSHOT_NAME = "ipea"
+
+# Cache e snapshots compartilhados entre todas as sessões do Streamlit
+_cache = DataCache(ttl=CACHE_TTL)
+_snapshots = SnapshotStore()
 
 class BigQuery:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, client=None, cache=None, ttl=None, incremental=True, snapshots=None, offline=OFFLINE) -> None:
+        # client permite injetar um cliente falso no lugar do bigquery.Client
+        self.client = client
+        self.cache = _cache if cache is None else cache
+        self.ttl = ttl
+        # incremental=True: ao expirar o cache, busca apenas as linhas novas
+        self.incremental = incremental
+        self.snapshots = _snapshots if snapshots is None else snapshots
+        # offline=True: usa somente os snapshots em disco, sem consultar o BigQuery
+        self.offline = offline
     
     def create_credentials(self):
-   
+
+        if self.client is not None:
+            return self.client
+
+        # Importados só quando é preciso conectar ao BigQuery (a partida a quente usa o snapshot)
+        import streamlit as st
+        from google.cloud import bigquery
 
     # Carrega secrets do Streamlit
         project_id = st.secrets["project_id"]
@@ -33,7 +57,7 @@ class BigQuery:
 
         return client
 
-    def create_querys_and_load_df(self):
+    def create_querys_and_load_df(self, watermark=None):
 
         client = self.create_credentials()  
 
@@ -41,6 +65,15 @@ class BigQuery:
             SELECT * FROM `tc-fiap.fase_4.ipea_tratada_final` 
             WHERE Data > DATE_SUB(CURRENT_DATE(), INTERVAL 5 YEAR)
             """
+        job_config = None
+
+        # Modo incremental: busca apenas as linhas posteriores ao watermark
+        if watermark is not None:
+            query_brent_oil = """
+                SELECT * FROM `tc-fiap.fase_4.ipea_tratada_final` 
+                WHERE Data > @watermark
+                """
+            job_config = self.watermark_job_config(watermark)
 
         petroleum_consumption= pd.DataFrame({
             "year": [2024, 2023, 2022, 2021, 2020, 2019],
@@ -55,11 +88,23 @@ class BigQuery:
             ]
         })
                 
-        ipea_df = client.query(query_brent_oil).to_dataframe()
+        with recorder.span('bigquery.query') as span:
+            if job_config is None:
+                ipea_df = client.query(query_brent_oil).to_dataframe()
+            else:
+                ipea_df = client.query(query_brent_oil, job_config=job_config).to_dataframe()
+            span['rows'] = len(ipea_df)
         
         return ipea_df, petroleum_consumption
     
 
+    def watermark_job_config(self, watermark):
+        from google.cloud import bigquery
+
+        return bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("watermark", "DATE", pd.Timestamp(watermark).date())
+        ])
+
     def prepare_data(self, df):
 
         df_0 = df.copy()
@@ -76,14 +121,167 @@ class BigQuery:
         
         return df_0 , ipea_avg_per_year
     
-    
+
+    def append_new_rows(self, prepared_df, new_rows):
+        # Aplica o asfreq('D')/bfill apenas na cauda nova e anexa ao frame já tratado
+        tail = new_rows.rename(columns={'Preco': 'preco_bpd_US', 'Data': 'data'})
+        tail['data'] = pd.to_datetime(tail['data'])
+        tail = tail.set_index('data').sort_index()
+        tail = tail[(tail.index > prepared_df.index.max()) & (tail.index <= pd.to_datetime('today'))]
+
+        if tail.empty:
+            return prepared_df
+
+        # O último dia já tratado entra como âncora para que o asfreq cubra o intervalo
+        # entre o watermark e a primeira linha nova
+        tail = pd.concat([prepared_df.iloc[-1:].drop(columns='year'), tail]).asfreq('D')
+        tail = tail.bfill().iloc[1:]
+        tail['year'] = tail.index.year
+
+        df_0 = pd.concat([prepared_df, tail])
+
+        # Mantém a mesma janela de 5 anos da consulta completa
+        window_start = pd.to_datetime('today').normalize() - pd.DateOffset(years=5)
+        return df_0[df_0.index > window_start]
+
+
     def create_dfs(self):
+        return self.cache.get_or_update(CACHE_KEY, self.load_warm, ttl=self.ttl)
+
+    def refresh_dfs(self):
+        # Atualiza os dados em cache mesmo que o TTL ainda não tenha expirado
+        return self.cache.update(CACHE_KEY, self.fetch, ttl=self.ttl)
+
+    def load_warm(self, previous):
+        # Partida a quente: serve o último snapshot em disco e atualiza em segundo plano
+        if previous is None:
+            frames = self.snapshots.load(SNAPSHOT_NAME)
+            if frames is not None:
+                if not self.offline:
+                    self.snapshots.refresh_in_background(SNAPSHOT_NAME, self.refresh_dfs)
+                return frames['ipea_df'], frames['merged_df']
+
+        return self.fetch(previous)
+
+    def fetch(self, previous):
+        if self.offline:
+            if previous is None:
+                raise RuntimeError(f"Modo offline sem snapshot disponível em '{self.snapshots.directory}'")
+            return previous
+
+        if self.incremental:
+            ipea_df, merged_df = self.load_incremental(previous)
+        else:
+            ipea_df, merged_df = self.load_dfs()
+
+        self.snapshots.save(SNAPSHOT_NAME, {'ipea_df': ipea_df, 'merged_df': merged_df})
+        return ipea_df, merged_df
+
+    def invalidate(self):
+        # Força uma nova consulta ao BigQuery na próxima chamada de create_dfs
+        self.cache.invalidate(CACHE_KEY)
+
+    def load_dfs(self):
         ipea_df, petroleum_consumption = self.create_querys_and_load_df()
 
-        ipea_df, ipea_avg_per_year = self.prepare_data(ipea_df)
+        with recorder.span('bigquery.prepare', rows=len(ipea_df)):
+            ipea_df, ipea_avg_per_year = self.prepare_data(ipea_df)
 
         merged_df = pd.merge(ipea_avg_per_year, petroleum_consumption, on='year', how='left')
         
 
         return ipea_df, merged_df
+
+    def load_incremental(self, previous):
+        # Sem dados em memória ainda: faz a carga completa
+        if previous is None:
+            return self.load_dfs()
+
+        held_df, _ = previous
+        new_rows, petroleum_consumption = self.create_querys_and_load_df(watermark=held_df.index.max())
+
+        with recorder.span('bigquery.append', rows=len(new_rows)):
+            ipea_df = self.append_new_rows(held_df, new_rows)
+        ipea_avg_per_year = ipea_df.groupby('year')['preco_bpd_US'].mean().reset_index()
+
+        merged_df = pd.merge(ipea_avg_per_year, petroleum_consumption, on='year', how='left')
+
+        return ipea_df, merged_df
     
+
+
+MARKET_CACHE_TTL = int(os.environ.get("MARKET_CACHE_TTL", 24 * 3600))
+MARKET_CACHE_KEY = "df_yfinance"
+MARKET_SNAPSHOT_NAME = "yfinance"
+
+# Colunas do df_yfinance e os tickers correspondentes no Yahoo Finance
+MARKET_TICKERS = {
+    "indice_dolar_eua_dxy": "DX-Y.NYB",
+    "tx_juros_eua": "^TNX",
+}
+
+class MarketData:
+    def __init__(self, start="2019-01-01", end="2024-12-31", cache=None, ttl=MARKET_CACHE_TTL, snapshots=None, offline=OFFLINE, fixture=None) -> None:
+        self.start = start
+        self.end = end
+        self.cache = _cache if cache is None else cache
+        self.ttl = ttl
+        self.snapshots = _snapshots if snapshots is None else snapshots
+        self.offline = offline
+        # fixture: DataFrame (ou caminho de um Parquet) servido no lugar do yfinance, para testes
+        self.fixture = fixture
+
+    def get(self):
+        # Só baixa os dados quando alguma aba realmente precisa deles
+        if self.fixture is not None:
+            if isinstance(self.fixture, str):
+                self.fixture = pd.read_parquet(self.fixture)
+            return self.fixture
+
+        return self.cache.get_or_update(self.cache_key(), self.load_warm, ttl=self.ttl)
+
+    def cache_key(self):
+        return (MARKET_CACHE_KEY, self.start, self.end)
+
+    def invalidate(self):
+        self.cache.invalidate(self.cache_key())
+
+    def refresh(self):
+        return self.cache.update(self.cache_key(), self.fetch, ttl=self.ttl)
+
+    def load_warm(self, previous):
+        if previous is None:
+            frames = self.snapshots.load(MARKET_SNAPSHOT_NAME)
+            if frames is not None:
+                if not self.offline and self.snapshots.age(MARKET_SNAPSHOT_NAME) > self.ttl:
+                    self.snapshots.refresh_in_background(MARKET_SNAPSHOT_NAME, self.refresh)
+                return frames['df_yfinance']
+
+        return self.fetch(previous)
+
+    def fetch(self, previous):
+        if self.offline:
+            if previous is None:
+                raise RuntimeError(f"Modo offline sem snapshot disponível em '{self.snapshots.directory}'")
+            return previous
+
+        df_yfinance = self.download()
+        self.snapshots.save(MARKET_SNAPSHOT_NAME, {'df_yfinance': df_yfinance})
+        return df_yfinance
+
+    def download(self):
+        import yfinance as yf
+
+        # Uma única chamada com threads=True baixa os tickers em paralelo
+        tickers = list(MARKET_TICKERS.values())
+        with recorder.span('yfinance.download') as span:
+            data = yf.download(tickers, start=self.start, end=self.end, threads=True, progress=False)
+            span['rows'] = len(data)
+
+        df_yfinance = pd.DataFrame({
+            column: data['Close'][ticker] for column, ticker in MARKET_TICKERS.items()
+        })
+
+        # Mantém apenas os dias de pregão do DXY, como na versão anterior
+        dxy_dates = df_yfinance['indice_dolar_eua_dxy'].dropna().index
+        return df_yfinance.loc[dxy_dates]
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from cache import LRUCache, fingerprint
+from instrumentation import recorder
+
+
+class Decomposition:
+    # Mesmos atributos do DecomposeResult do statsmodels usados pelos gráficos
+    def __init__(self, observed, trend, seasonal, resid) -> None:
+        self.observed = observed
+        self.trend = trend
+        self.seasonal = seasonal
+        self.resid = resid
+
+    def nbytes(self):
+        return 4 * self.observed.values.nbytes
+
+
+def centered_moving_average(x, period):
+    # Média móvel centrada do seasonal_decompose (filtro 2xMA para período par) em O(n) com somas acumuladas
+    n = len(x)
+    half = period // 2
+    trend = np.full(n, np.nan)
+    if n <= 2 * half:
+        return trend
+
+    cs = np.concatenate(([0.0], np.cumsum(x)))
+    center = np.arange(half, n - half)
+    if period % 2:
+        trend[center] = (cs[center + half + 1] - cs[center - half]) / period
+    else:
+        trend[center] = ((cs[center + half] - cs[center - half]) + (cs[center + half + 1] - cs[center - half + 1])) / (2 * period)
+    return trend
+
+
+def seasonal_from_trend(x, trend, period, model='additive'):
+    # Médias por fase do ciclo (ignorando as bordas sem tendência), via bincount
+    n = len(x)
+    detrended = x / trend if model == 'multiplicative' else x - trend
+    phase = np.arange(n) % period
+    valid = ~np.isnan(detrended)
+
+    sums = np.bincount(phase[valid], weights=detrended[valid], minlength=period)
+    counts = np.bincount(phase[valid], minlength=period)
+    period_averages = sums / counts
+
+    if model == 'multiplicative':
+        period_averages /= np.mean(period_averages)
+        seasonal = np.tile(period_averages, n // period + 1)[:n]
+        resid = x / seasonal / trend
+    else:
+        period_averages -= np.mean(period_averages)
+        seasonal = np.tile(period_averages, n // period + 1)[:n]
+        resid = x - trend - seasonal
+    return seasonal, resid
+
+
+def seasonal_decompose(series, period, model='additive'):
+    # Equivalente vetorizado de statsmodels.tsa.seasonal.seasonal_decompose (sem extrapolar a tendência)
+    x = series.to_numpy(dtype='float64')
+    if np.isnan(x).any():
+        raise ValueError("A série não pode ter valores ausentes")
+    if len(x) < 2 * period:
+        raise ValueError(f"A série precisa de 2 ciclos completos ({2 * period} observações)")
+
+    trend = centered_moving_average(x, period)
+    seasonal, resid = seasonal_from_trend(x, trend, period, model)
+    return to_result(series, trend, seasonal, resid)
+
+
+def to_result(series, trend, seasonal, resid):
+    index = series.index
+    return Decomposition(
+        series,
+        pd.Series(trend, index=index, name='trend'),
+        pd.Series(seasonal, index=index, name='seasonal'),
+        pd.Series(resid, index=index, name='resid'),
+    )
+
+
+class DecompositionService:
+    # Memoiza decomposições por (série, intervalo, período, modelo). Para um intervalo contínuo
+    # de uma série base já decomposta, reaproveita a tendência calculada na série inteira:
+    # a média móvel centrada em um ponto só depende dos vizinhos, então é idêntica no recorte,
+    # exceto nas period//2 pontas, que ficam sem tendência como no statsmodels.
+    def __init__(self, max_bytes=128 * 1024 ** 2) -> None:
+        self.cache = LRUCache(max_bytes=max_bytes, sizeof=lambda result: result.nbytes())
+
+    def decompose(self, series, period, model='additive', base=None):
+        # base: série completa da qual series foi filtrada (ex.: ipea_df inteiro)
+        if len(series) == 0:
+            raise ValueError("A série está vazia")
+        start = self.slice_of(series, base)
+        parent = series if start is None else base
+        key = (fingerprint(parent), series.index[0], series.index[-1], len(series), period, model)
+
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        with recorder.span(f'decomposition.{period}', rows=len(series)):
+            if start is None:
+                result = seasonal_decompose(series, period, model)
+            else:
+                result = self.decompose_range(base, start, len(series), period, model)
+
+        return self.cache.set(key, result)
+
+    def slice_of(self, series, base):
+        # Posição inicial de series dentro de base, se for um recorte contínuo dela
+        if base is None or len(series) == 0 or len(series) == len(base):
+            return None
+        start = base.index.searchsorted(series.index[0])
+        stop = start + len(series)
+        if stop > len(base) or base.index[start] != series.index[0] or base.index[stop - 1] != series.index[-1]:
+            return None
+        return start
+
+    def decompose_range(self, base, start, length, period, model):
+        if length < 2 * period:
+            raise ValueError(f"A série precisa de 2 ciclos completos ({2 * period} observações)")
+
+        full = self.decompose(base, period, model)
+        series = base.iloc[start:start + length]
+        x = series.to_numpy(dtype='float64')
+
+        trend = full.trend.to_numpy()[start:start + length].copy()
+        half = period // 2
+        trend[:half] = np.nan
+        trend[length - half:] = np.nan
+
+        seasonal, resid = seasonal_from_trend(x, trend, period, model)
+        return to_result(series, trend, seasonal, resid)
+
+
+# Serviço compartilhado por todas as sessões do processo
+decomposition_service = DecompositionService()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import numpy as np
+from cache import LRUCache
+
+# Máximo de pontos por gráfico de linha enviado ao navegador (~ largura do gráfico em pixels)
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", 1000))
+
+# Índices das linhas selecionadas, por (dados, colunas, orçamento de pontos, método)
+_selections = LRUCache(max_bytes=32 * 1024 ** 2, sizeof=lambda positions: positions.nbytes)
+
+
+def as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        # Dias desde o primeiro ponto: mantém as áreas do LTTB em uma escala estável
+        values = values.astype('datetime64[ns]').astype(np.int64)
+        return (values - values[0]) / 86_400e9 if len(values) else values.astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb(x, y, max_points):
+    # Largest-Triangle-Three-Buckets: mantém o primeiro e o último ponto e, em cada bucket,
+    # o ponto que forma o maior triângulo com o ponto escolhido antes e a média do próximo bucket
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    # Limites dos buckets e médias de cada bucket via somas acumuladas
+    edges = (np.floor(np.arange(max_points - 1) * (n - 2) / (max_points - 2)) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 >= len(edges):
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            next_stop = edges[i + 2]
+            avg_x = (cx[next_stop] - cx[stop]) / (next_stop - stop)
+            avg_y = (cy[next_stop] - cy[stop]) / (next_stop - stop)
+
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
+
+
+def min_max(y, max_points):
+    # Mínimo e máximo de cada bucket: preserva picos e vales com metade dos buckets
+    n = len(y)
+    if n <= max_points or max_points < 4:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, max_points // 2 + 1).astype(np.int64)
+    selected = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop > start:
+            bucket = y[start:stop]
+            selected.extend((start + int(np.argmin(bucket)), start + int(np.argmax(bucket))))
+    return np.unique(selected)
+
+
+def selection_key(df, x, y, max_points, method):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(df[x].values).tobytes())
+    digest.update(np.asarray(df[y].values, dtype=np.float64).tobytes())
+    return (digest.hexdigest(), x, y, max_points, method)
+
+
+def downsample(df, x, y, max_points=None, method='lttb'):
+    # Reduz df às linhas que representam a curva y(x) com no máximo max_points pontos
+    max_points = CHART_MAX_POINTS if max_points is None else max_points
+    if len(df) <= max_points:
+        return df
+
+    key = selection_key(df, x, y, max_points, method)
+    positions = _selections.get(key)
+    if positions is None:
+        y_values = as_float(df[y].values)
+        valid = np.flatnonzero(~np.isnan(y_values))
+        if method == 'minmax':
+            positions = valid[min_max(y_values[valid], max_points)]
+        else:
+            positions = valid[lttb(as_float(df[x].values[valid]), y_values[valid], max_points)]
+        _selections.set(key, positions)
+
+    return df.iloc[positions]
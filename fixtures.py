@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+# Cliente falso do BigQuery para benchmarks e testes de carga, sem rede nem credenciais:
+# BigQuery(client=FakeClient(anos)) recebe uma série sintética no formato da tabela do IPEA
+
+
+class FakeQueryJob:
+    def __init__(self, df) -> None:
+        self.df = df
+
+    def to_dataframe(self):
+        return self.df.copy()
+
+
+class FakeClient:
+    # Série sintética em dias úteis, como a base do IPEA. Reproduz os filtros das consultas de
+    # database.BigQuery: a carga completa traz os últimos window_years anos e a incremental
+    # (job_config={'watermark': data}) só as linhas posteriores ao watermark.
+    # Para simular dados novos, troque ou estenda self.df entre as cargas.
+    def __init__(self, years=5, seed=42, window_years=5) -> None:
+        end = pd.Timestamp.today().normalize()
+        dates = pd.bdate_range(end - pd.DateOffset(years=years), end)
+        rng = np.random.default_rng(seed)
+        prices = np.clip(70 + np.cumsum(rng.normal(0, 1, len(dates))), 10, None)
+        self.df = pd.DataFrame({'Data': dates.date, 'Preco': prices.round(2)})
+        self.window_years = window_years
+        self.queries = []
+
+    def query(self, query, job_config=None):
+        # Mesmo QueryJobConfig que o bigquery.Client recebe: o watermark vem dos query_parameters
+        parameters = {} if job_config is None else {p.name: p.value for p in job_config.query_parameters}
+        watermark = parameters.get('watermark')
+        self.queries.append(watermark)
+        if watermark is None:
+            watermark = (pd.Timestamp.today().normalize() - pd.DateOffset(years=self.window_years)).date()
+        return FakeQueryJob(self.df[self.df['Data'] > watermark])
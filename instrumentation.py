@@ -0,0 +1,201 @@
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Spans por etapa (tempo, linhas processadas e memória alocada) de cada rerun do Streamlit
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_DIR = os.environ.get("METRICS_DIR", "metrics")
+# Saída em disco, desligada por padrão (os spans ficam só em memória, para o painel de administração):
+# jsonl: uma linha por span em spans.jsonl; prometheus: resumo por etapa em metrics.prom
+METRICS_FORMAT = os.environ.get("METRICS_FORMAT", "none")
+# jsonl: spans gravados em lotes; o arquivo é rotacionado (spans.jsonl.1) ao passar do limite
+METRICS_FLUSH_EVERY = int(os.environ.get("METRICS_FLUSH_EVERY", 200))
+METRICS_MAX_BYTES = int(os.environ.get("METRICS_MAX_BYTES", 16 * 1024 ** 2))
+# prometheus: intervalo mínimo (em segundos) entre duas gravações do metrics.prom
+METRICS_PROMETHEUS_INTERVAL = float(os.environ.get("METRICS_PROMETHEUS_INTERVAL", 15))
+# A memória alocada vem do tracemalloc, que encarece todas as alocações: fica desligada por padrão
+METRICS_TRACE_MEMORY = os.environ.get("METRICS_TRACE_MEMORY", "0") == "1"
+# Painel ?admin=1 na barra lateral: expõe tempos e estado dos caches, só com ADMIN_PANEL=1
+ADMIN_PANEL = os.environ.get("ADMIN_PANEL", "0") == "1"
+
+# Rerun em andamento na thread do script (cada sessão do Streamlit roda na sua própria thread)
+_rerun = contextvars.ContextVar("rerun", default=None)
+_rerun_ids = itertools.count(1)
+
+
+def escape(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"')
+
+
+class Recorder:
+    # Guarda os spans recentes em memória (para o painel de administração) e, com METRICS_FORMAT,
+    # exporta para disco. Spans fora de um rerun (ex.: worker em segundo plano) ficam sem rerun.
+    def __init__(self, directory=METRICS_DIR, format=METRICS_FORMAT, enabled=METRICS_ENABLED, trace_memory=METRICS_TRACE_MEMORY, keep=5000,
+                 flush_every=METRICS_FLUSH_EVERY, max_bytes=METRICS_MAX_BYTES, prometheus_interval=METRICS_PROMETHEUS_INTERVAL) -> None:
+        self.directory = directory
+        self.format = format
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = deque(maxlen=keep)
+        # Totais acumulados desde o início do processo, por etapa (contadores do Prometheus)
+        self.totals = {}
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self.prometheus_interval = prometheus_interval
+        # Spans ainda não gravados no spans.jsonl
+        self.pending = []
+        self.last_prometheus = 0.0
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, rows=None):
+        # O dict devolvido aceita 'rows' dentro do bloco, quando o tamanho só é conhecido no fim
+        record = {'stage': stage, 'rows': rows}
+        if not self.enabled:
+            yield record
+            return
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            # Com várias sessões ao mesmo tempo, a memória inclui alocações das outras threads
+            if memory_before is not None and tracemalloc.is_tracing():
+                record['memory_bytes'] = tracemalloc.get_traced_memory()[0] - memory_before
+            self.record(record)
+
+    def record(self, record):
+        rerun = _rerun.get()
+        record['time'] = time.time()
+        record['rerun'] = rerun['id'] if rerun is not None else None
+        record['thread'] = threading.current_thread().name
+
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault(record['stage'], {'count': 0, 'seconds': 0.0, 'rows': 0, 'memory_bytes': 0})
+            totals['count'] += 1
+            totals['seconds'] += record['seconds']
+            totals['rows'] += record['rows'] or 0
+            totals['memory_bytes'] += record.get('memory_bytes') or 0
+
+            flush = False
+            if self.format == 'jsonl':
+                self.pending.append(record)
+                flush = len(self.pending) >= self.flush_every
+
+        # A gravação acontece fora do lock dos spans, uma vez por lote
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, []
+        if not pending:
+            return
+
+        with self._file_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, 'spans.jsonl')
+            if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+                os.replace(path, path + '.1')
+            with open(path, 'a') as f:
+                f.write(''.join(json.dumps(record, default=str) + '\n' for record in pending))
+
+    def begin_rerun(self):
+        if self.enabled:
+            _rerun.set({'id': next(_rerun_ids), 'start': time.perf_counter()})
+
+    def end_rerun(self):
+        # Reruns interrompidos (st.rerun, st.stop) não chegam aqui e não geram o span 'rerun'
+        rerun = _rerun.get()
+        if rerun is None:
+            return
+        self.record({'stage': 'rerun', 'rows': None, 'seconds': time.perf_counter() - rerun['start']})
+        _rerun.set(None)
+        if self.format == 'prometheus' and time.monotonic() - self.last_prometheus >= self.prometheus_interval:
+            self.last_prometheus = time.monotonic()
+            self.write_prometheus()
+
+    def summary(self):
+        # p50/p95 dos spans recentes de cada etapa
+        with self._lock:
+            records = list(self.records)
+        if not records:
+            return pd.DataFrame(columns=['stage', 'count', 'p50_ms', 'p95_ms', 'rows', 'memory_mb'])
+
+        df = pd.DataFrame(records)
+        grouped = df.groupby('stage')
+        summary = pd.DataFrame({
+            'count': grouped.size(),
+            'p50_ms': grouped['seconds'].quantile(0.5) * 1000,
+            'p95_ms': grouped['seconds'].quantile(0.95) * 1000,
+            'rows': grouped['rows'].mean(),
+            'memory_mb': grouped['memory_bytes'].mean() / 1024 ** 2 if 'memory_bytes' in df else float('nan'),
+        })
+        return summary.sort_values('p95_ms', ascending=False).reset_index()
+
+    def quantiles(self):
+        # p50/p95 (em segundos) dos spans recentes de cada etapa, sem montar um DataFrame
+        with self._lock:
+            records = list(self.records)
+        durations = {}
+        for record in records:
+            durations.setdefault(record['stage'], []).append(record['seconds'])
+        return {stage: np.quantile(values, [0.5, 0.95]) for stage, values in durations.items()}
+
+    def prometheus(self):
+        quantiles = self.quantiles()
+        with self._lock:
+            totals = {stage: dict(values) for stage, values in self.totals.items()}
+
+        lines = [
+            "# HELP app_stage_seconds Tempo de cada etapa (quantis dos spans recentes)",
+            "# TYPE app_stage_seconds summary",
+        ]
+        for stage, values in sorted(totals.items()):
+            label = escape(stage)
+            if stage in quantiles:
+                p50, p95 = quantiles[stage]
+                lines.append(f'app_stage_seconds{{stage="{label}",quantile="0.5"}} {p50:.6f}')
+                lines.append(f'app_stage_seconds{{stage="{label}",quantile="0.95"}} {p95:.6f}')
+            lines.append(f'app_stage_seconds_sum{{stage="{label}"}} {values["seconds"]:.6f}')
+            lines.append(f'app_stage_seconds_count{{stage="{label}"}} {values["count"]}')
+
+        lines += ["# HELP app_stage_rows_total Linhas processadas por etapa", "# TYPE app_stage_rows_total counter"]
+        lines += [f'app_stage_rows_total{{stage="{escape(stage)}"}} {values["rows"]}' for stage, values in sorted(totals.items())]
+        if self.trace_memory:
+            lines += ["# HELP app_stage_memory_bytes_total Memória alocada por etapa", "# TYPE app_stage_memory_bytes_total counter"]
+            lines += [f'app_stage_memory_bytes_total{{stage="{escape(stage)}"}} {values["memory_bytes"]}' for stage, values in sorted(totals.items())]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        # Escrita atômica, para o coletor nunca ler um arquivo pela metade
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, 'metrics.prom')
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+# Registro compartilhado por todas as sessões do processo
+recorder = Recorder()
+# Grava o último lote de spans ao encerrar o processo
+atexit.register(recorder.flush)
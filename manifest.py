@@ -0,0 +1,35 @@
+import json
+import os
+
+# Artefatos versionados gerados por train.py: MODELS_DIR/prophet-<versão>.pkl com o
+# manifesto ao lado (prophet-<versão>.json). Lido também pelo app, sem importar o treino.
+
+MODELS_DIR = os.environ.get("MODELS_DIR", "models")
+
+
+def manifest_path(model_path):
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def read_manifest(model_path):
+    path = manifest_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_versions(directory=MODELS_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[len('prophet-'):-len('.json')] for name in os.listdir(directory)
+        if name.startswith('prophet-') and name.endswith('.json')
+    )
+
+
+def latest_model_path(directory=MODELS_DIR):
+    versions = list_versions(directory)
+    if not versions:
+        return None
+    return os.path.join(directory, f"prophet-{versions[-1]}.pkl")
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from instrumentation import recorder
+
+
+class LoadedModel:
+    def __init__(self, model, path, signature, sha256, load_seconds, size_bytes, memory_bytes=None) -> None:
+        self.model = model
+        self.path = path
+        self.signature = signature
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        # Tamanho do artefato em disco; a memória alocada no unpickle só é medida com
+        # METRICS_TRACE_MEMORY=1 (ver instrumentation.py), senão fica None
+        self.size_bytes = size_bytes
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    # Carrega cada artefato de modelo uma única vez por processo e compartilha a mesma
+    # instância (somente leitura) entre as sessões. O arquivo é recarregado quando muda.
+    def __init__(self, loader=None) -> None:
+        # loader=None usa o joblib.load, importado apenas quando um modelo é carregado
+        self.loader = loader
+        self._entries = {}
+        self._path_locks = {}
+        self._lock = threading.Lock()
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def signature(self, path):
+        # mtime + tamanho: verificação barata feita a cada acesso
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def entry(self, path):
+        path = os.path.abspath(path)
+        signature = self.signature(path)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        with self._path_lock(path):
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                return entry
+            entry = self.load(path, signature)
+            self._entries[path] = entry
+            return entry
+
+    def get(self, path):
+        return self.entry(path).model
+
+    def load(self, path, signature):
+        with open(path, 'rb') as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        # Mesmo conteúdo com outro mtime (ex.: arquivo copiado): reaproveita o modelo
+        previous = self._entries.get(path)
+        if previous is not None and previous.sha256 == sha256:
+            previous.signature = signature
+            return previous
+
+        start = time.perf_counter()
+        with recorder.span('model.unpickle') as span:
+            model = self.load_bytes(data)
+        load_seconds = time.perf_counter() - start
+
+        return LoadedModel(model, path, signature, sha256, load_seconds, len(data), span.get('memory_bytes'))
+
+    def load_bytes(self, data):
+        if self.loader is None:
+            import joblib
+            return joblib.load(io.BytesIO(data))
+        return self.loader(io.BytesIO(data))
+
+    def stats(self):
+        return [
+            {
+                'path': entry.path,
+                'sha256': entry.sha256,
+                'load_seconds': entry.load_seconds,
+                'size_bytes': entry.size_bytes,
+                'memory_bytes': entry.memory_bytes,
+                'loaded_at': entry.loaded_at,
+            }
+            for entry in list(self._entries.values())
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Registro compartilhado por todas as sessões do Streamlit
+registry = ModelRegistry()
@@ -0,0 +1,52 @@
+import threading
+import pandas as pd
+from aggregates import monthly_cube
+from cache import fingerprint
+from decomposition import decomposition_service
+from downsampling import downsample
+
+
+def build_report(ipea_df, market_df, current_year):
+    # Dados prontos para os gráficos e métricas da aba Relatório
+    decomposition = decomposition_service.decompose(ipea_df['preco_bpd_US'], period=12)
+    decomposition_data = pd.DataFrame({
+        'data': ipea_df.index,
+        'trend': decomposition.trend,
+        'seasonal': decomposition.seasonal,
+        'residual': decomposition.resid
+    }).dropna()
+
+    # Preço médio dos últimos 5 anos e desvio padrão mensal de toda a série
+    cube = monthly_cube(ipea_df['preco_bpd_US'])
+    start_year = current_year - 5
+    annual_prices = cube.annual_mean(ipea_df.index.min(), ipea_df.index.max(), years=range(start_year + 1, current_year + 1))
+    monthly_volatility = cube.monthly_std(ipea_df.index.min(), ipea_df.index.max())
+
+    return {
+        'trend': downsample(decomposition_data, 'data', 'trend'),
+        'seasonal': downsample(decomposition_data, 'data', 'seasonal'),
+        'residual': downsample(decomposition_data, 'data', 'residual'),
+        'annual_prices': annual_prices,
+        'monthly_volatility': downsample(monthly_volatility, 'data', 'preco_bpd_US'),
+        'm_price_p': round(float(ipea_df['preco_bpd_US'].mean()), 2),
+        'm_dxy_eua': round(float(market_df['indice_dolar_eua_dxy'].mean()), 2),
+        'm_tx_eua': round(float(market_df['tx_juros_eua'].mean()), 2),
+    }
+
+
+# Relatórios já montados, por versão dos dados de preços e de mercado
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+def report_data(ipea_df, market_df, current_year=None):
+    current_year = pd.Timestamp.now().year if current_year is None else current_year
+    key = (fingerprint(ipea_df['preco_bpd_US']), fingerprint(market_df['indice_dolar_eua_dxy']),
+           fingerprint(market_df['tx_juros_eua']), current_year)
+    with _reports_lock:
+        report = _reports.get(key)
+        if report is None:
+            # Guarda apenas o relatório da versão mais recente dos dados
+            _reports.clear()
+            report = _reports[key] = build_report(ipea_df, market_df, current_year)
+    return report
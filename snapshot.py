@@ -0,0 +1,82 @@
+import os
+import shutil
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Diretório onde ficam os snapshots Parquet dos dados já tratados
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+
+# OFFLINE_MODE=1 faz o app subir apenas com os snapshots, sem acesso à rede
+OFFLINE = os.environ.get("OFFLINE_MODE", "0") == "1"
+
+# Threads de atualização em andamento, por processo (o script do Streamlit é reexecutado a cada interação)
+_threads = {}
+_threads_lock = threading.Lock()
+
+
+class SnapshotStore:
+    # Guarda versões dos DataFrames tratados em Parquet, uma pasta por versão:
+    # <directory>/<name>/<version>/<frame>.parquet
+    def __init__(self, directory=SNAPSHOT_DIR, keep=3) -> None:
+        self.directory = directory
+        self.keep = keep
+
+    def versions(self, name):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(v for v in os.listdir(path) if not v.startswith("."))
+
+    def save(self, name, frames):
+        version = time.strftime("%Y%m%dT%H%M%S") + f"{time.time_ns() % 10**9:09d}"
+        final_path = os.path.join(self.directory, name, version)
+        tmp_path = os.path.join(self.directory, name, "." + version)
+        os.makedirs(tmp_path, exist_ok=True)
+
+        for frame_name, df in frames.items():
+            pq.write_table(pa.Table.from_pandas(df), os.path.join(tmp_path, f"{frame_name}.parquet"))
+
+        # A versão só fica visível depois de escrita por completo
+        os.replace(tmp_path, final_path)
+        self.prune(name)
+        return version
+
+    def load(self, name, version=None):
+        versions = self.versions(name)
+        if not versions:
+            return None
+        version = versions[-1] if version is None else version
+        path = os.path.join(self.directory, name, version)
+
+        frames = {}
+        for file_name in os.listdir(path):
+            if file_name.endswith(".parquet"):
+                table = pq.read_table(os.path.join(path, file_name), memory_map=True)
+                frames[file_name[:-len(".parquet")]] = table.to_pandas()
+        return frames
+
+    def age(self, name):
+        # Idade (em segundos) da versão mais recente, ou None se não houver snapshot
+        versions = self.versions(name)
+        if not versions:
+            return None
+        return time.time() - os.path.getmtime(os.path.join(self.directory, name, versions[-1]))
+
+    def prune(self, name):
+        for version in self.versions(name)[:-self.keep]:
+            shutil.rmtree(os.path.join(self.directory, name, version), ignore_errors=True)
+
+    def refresh_in_background(self, name, refresh):
+        # Executa refresh em uma thread, no máximo uma por snapshot
+        key = (os.path.abspath(self.directory), name)
+        with _threads_lock:
+            thread = _threads.get(key)
+            if thread is not None and thread.is_alive():
+                return thread
+            thread = threading.Thread(target=refresh, name=f"snapshot-refresh-{name}", daemon=True)
+            _threads[key] = thread
+            thread.start()
+            return thread
+
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from aggregates import MonthlyCube
+
+
+def price_series():
+    index = pd.bdate_range("2019-01-01", "2023-12-31", name="data")
+    rng = np.random.default_rng(7)
+    series = pd.Series(70 + np.cumsum(rng.normal(0, 1, len(index))), index=index, name="preco_bpd_US")
+    # Dias sem cotação, como na série do IPEA
+    series.iloc[rng.choice(len(series), 40, replace=False)] = np.nan
+    return series
+
+
+def filtered(series, start_date, end_date, years, months):
+    df = series.dropna().to_frame()
+    mask = (df.index >= start_date) & (df.index <= end_date)
+    if years is not None:
+        mask &= df.index.year.isin(years)
+    if months is not None:
+        mask &= df.index.month.isin(months)
+    return df[mask]
+
+
+FILTERS = [
+    ("2019-01-01", "2023-12-31", None, None),
+    ("2019-03-14", "2022-08-09", None, None),
+    ("2019-03-14", "2022-08-09", [2020, 2022], None),
+    ("2019-03-14", "2022-08-09", None, [3, 8, 12]),
+    ("2020-02-10", "2020-02-20", None, None),
+]
+
+
+@pytest.mark.parametrize("start_date, end_date, years, months", FILTERS)
+def test_monthly_std_matches_resample(start_date, end_date, years, months):
+    series = price_series()
+    expected = filtered(series, pd.Timestamp(start_date), pd.Timestamp(end_date), years, months)['preco_bpd_US'].resample('ME').std().reset_index()
+    result = MonthlyCube(series).monthly_std(start_date, end_date, years, months)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, check_index_type=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("start_date, end_date, years, months", FILTERS)
+def test_annual_mean_matches_resample(start_date, end_date, years, months):
+    series = price_series()
+    expected = filtered(series, pd.Timestamp(start_date), pd.Timestamp(end_date), years, months)[['preco_bpd_US']].resample('YE').mean().reset_index()
+    result = MonthlyCube(series).annual_mean(start_date, end_date, years, months)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False, check_index_type=False, rtol=1e-9)
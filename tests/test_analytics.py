@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import CrossAssetAnalytics, LABELS
+
+
+def frames():
+    rng = np.random.default_rng(11)
+    days = pd.date_range("2019-01-01", "2021-12-31", freq="D", name="data")
+    brent = pd.Series(70 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days)))), index=days)
+    ipea_df = pd.DataFrame({"preco_bpd_US": brent})
+    # Brent sem cotação em alguns dias; o mercado só tem dias úteis
+    ipea_df.iloc[rng.choice(len(days), 30, replace=False)] = np.nan
+
+    trading = pd.bdate_range("2019-01-01", "2021-12-31", name="Date")
+    dxy = 96 * np.exp(np.cumsum(rng.normal(0, 0.004, len(trading))))
+    # Juros em parte guiados pelo Brent, para uma correlação diferente de zero
+    brent_returns = np.log(brent.reindex(trading).ffill()).diff().fillna(0).to_numpy()
+    juros = 2 + np.cumsum(rng.normal(0, 0.03, len(trading)) + 2 * brent_returns)
+    market_df = pd.DataFrame({"indice_dolar_eua_dxy": dxy, "tx_juros_eua": juros}, index=trading)
+    return ipea_df, market_df
+
+
+def reference_changes(ipea_df, market_df):
+    # Mesmo alinhamento descrito em CrossAssetAnalytics, com operações do pandas
+    prices = ipea_df["preco_bpd_US"].dropna()
+    aligned = market_df.join(prices, how="inner").dropna().sort_index()
+    return pd.DataFrame({
+        "brent": np.log(aligned["preco_bpd_US"]).diff(),
+        "dxy": np.log(aligned["indice_dolar_eua_dxy"]).diff(),
+        "juros_10a": aligned["tx_juros_eua"].diff(),
+    }).iloc[1:]
+
+
+@pytest.mark.parametrize("window", [5, 30, 120])
+def test_rolling_matches_pandas(window):
+    ipea_df, market_df = frames()
+    changes = reference_changes(ipea_df, market_df)
+    result = CrossAssetAnalytics(ipea_df, market_df).rolling(window, "2019-01-01", "2021-12-31")
+
+    brent = changes["brent"].rolling(window)
+    for name in ("dxy", "juros_10a"):
+        corr = brent.corr(changes[name]).dropna()
+        beta = (brent.cov(changes[name]) / changes[name].rolling(window).var()).dropna()
+        np.testing.assert_array_equal(result.index.values, corr.index.values)
+        np.testing.assert_allclose(result[f"corr_{name}"].values, corr.values, rtol=1e-7, atol=1e-10)
+        np.testing.assert_allclose(result[f"beta_{name}"].values, beta.values, rtol=1e-7, atol=1e-10)
+
+
+def test_rolling_slices_the_date_range():
+    ipea_df, market_df = frames()
+    analytics = CrossAssetAnalytics(ipea_df, market_df)
+    full = analytics.rolling(30, "2019-01-01", "2021-12-31")
+    part = analytics.rolling(30, "2020-03-01", "2020-06-30")
+    pd.testing.assert_frame_equal(part, full.loc["2020-03-01":"2020-06-30"])
+
+
+def test_lead_lag_matches_shifted_corr():
+    ipea_df, market_df = frames()
+    changes = reference_changes(ipea_df, market_df).loc["2020-01-01":"2020-12-31"]
+    result = CrossAssetAnalytics(ipea_df, market_df).lead_lag("2020-01-01", "2020-12-31", max_lag=5)
+
+    for name in ("dxy", "juros_10a"):
+        rows = result[result["ativo"] == LABELS[name]]
+        # lag > 0: o ativo antecede o Brent
+        expected = [changes["brent"].corr(changes[name].shift(lag)) for lag in rows["defasagem"]]
+        np.testing.assert_allclose(rows["correlacao"].values, expected, rtol=1e-9)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import pytest
+from tornado.testing import AsyncHTTPTestCase, gen_test
+import api
+from api import make_app, stub_source
+from worker import ForecastWorker
+
+
+class FakeModel:
+    # Prophet_model mínimo: previsão linear a partir do cutoff, com um atraso para que
+    # pedidos simultâneos se sobreponham
+    def __init__(self) -> None:
+        self.model_path = 'fake.pkl'
+        self.sha256 = uuid.uuid4().hex
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fingerprint(self):
+        return self.sha256
+
+    def cutoff(self):
+        return pd.Timestamp('2024-07-24')
+
+    def make_df_and_predict(self, max_date, include_history=True, history_tail=None, uncertainty_samples=None, seed=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        ds = pd.date_range(self.cutoff(), max_date, freq='D')
+        return pd.DataFrame({'ds': ds, 'yhat': np.arange(len(ds), dtype='float64')}), len(ds)
+
+
+class ApiTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.model = FakeModel()
+        self.worker = ForecastWorker(model_factory=lambda: self.model, data_source=stub_source())
+        return make_app(data_source=stub_source(), model_factory=lambda: self.model, worker=self.worker)
+
+    def test_forecast_json(self):
+        response = self.fetch('/api/forecast?end=2024-08-02')
+        assert response.code == 200
+        body = json.loads(response.body)
+        assert body['model_sha256'] == self.model.sha256
+        assert body['columns']['ds'][0] == '2024-07-24'
+        assert body['columns']['ds'][-1] == '2024-08-02'
+        assert body['columns']['yhat'][-1] == 9.0
+
+    def test_forecast_not_modified(self):
+        first = self.fetch('/api/forecast?end=2024-08-02')
+        etag = first.headers['Etag']
+        second = self.fetch('/api/forecast?end=2024-08-02', headers={'If-None-Match': etag})
+        assert second.code == 304
+        assert second.headers['Etag'] == etag
+        # O 304 sai antes de qualquer previsão ou serialização
+        assert self.model.calls == 1
+        other = self.fetch('/api/forecast?end=2024-08-03', headers={'If-None-Match': etag})
+        assert other.code == 200
+
+    @pytest.mark.filterwarnings("ignore::FutureWarning")
+    def test_series_not_modified(self):
+        first = self.fetch('/api/series?start=2024-01-01')
+        assert first.code == 200
+        second = self.fetch('/api/series?start=2024-01-01', headers={'If-None-Match': first.headers['Etag']})
+        assert second.code == 304
+
+    def test_forecast_parameter_validation(self):
+        too_far = (api.API_MAX_END + pd.Timedelta(days=1)).date()
+        for query in ('', 'end=amanha', 'end=2024-01-01', f'end={too_far}', 'end=2024-08-02&history_tail=-1',
+                      f'end=2024-08-02&samples={api.API_MAX_SAMPLES + 1}', 'end=2024-08-02&samples=10&seed=-1',
+                      'end=2024-08-02&format=csv'):
+            response = self.fetch(f'/api/forecast?{query}')
+            assert response.code == 400, query
+            assert 'error' in json.loads(response.body)
+        assert self.model.calls == 0
+
+    @gen_test
+    async def test_concurrent_requests_are_coalesced(self):
+        url = self.get_url('/api/forecast?end=2024-12-31&history_tail=30')
+        responses = await asyncio.gather(*[self.http_client.fetch(url) for _ in range(8)])
+        assert {response.code for response in responses} == {200}
+        assert len({response.body for response in responses}) == 1
+        assert self.model.calls == 1
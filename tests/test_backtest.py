@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from backtest import fold_name, fold_rows
+
+
+def base_frame(days):
+    ds = pd.date_range("2020-01-01", periods=days, freq="D")
+    return pd.DataFrame({"ds": ds, "y": 70 + np.sin(np.arange(days) / 10)})
+
+
+def test_fold_name_ignores_rows_after_the_horizon():
+    cutoff = pd.Timestamp("2020-06-01")
+    short, longer = base_frame(300), base_frame(400)
+    assert fold_name(fold_rows(short, cutoff, 90), cutoff) == fold_name(fold_rows(longer, cutoff, 90), cutoff)
+
+
+def test_fold_name_changes_with_the_rows_it_uses():
+    cutoff = pd.Timestamp("2020-06-01")
+    df_base = base_frame(400)
+    revised = df_base.copy()
+    revised.loc[revised["ds"] == cutoff + pd.Timedelta(days=10), "y"] += 1
+    assert fold_name(fold_rows(df_base, cutoff, 90), cutoff) != fold_name(fold_rows(revised, cutoff, 90), cutoff)
+    # O mesmo dia revisado fica fora de um horizonte mais curto
+    assert fold_name(fold_rows(df_base, cutoff, 5), cutoff) == fold_name(fold_rows(revised, cutoff, 5), cutoff)
@@ -0,0 +1,54 @@
+import threading
+import time
+from cache import DataCache, LRUCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = DataCache(ttl=10, clock=clock)
+    calls = []
+    load = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_load("key", load) == 1
+    clock.now = 9
+    assert cache.get_or_load("key", load) == 1
+    clock.now = 10
+    assert cache.get_or_load("key", load) == 2
+
+
+def test_concurrent_loads_run_once():
+    cache = DataCache(ttl=60)
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "df"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("key", load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["df"] * 8
+    assert len(calls) == 1
+
+
+def test_lru_evicts_by_size():
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 4)
+    cache.get("a")
+    cache.set("c", "x" * 4)
+    assert cache.keys() == ["a", "c"]
+    assert cache.nbytes == 8
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from charts import ChartCache
+
+
+def price_frame(offset=0.0):
+    index = pd.date_range("2023-01-01", periods=120, freq="D")
+    return pd.DataFrame({"data": index, "preco_bpd_US": np.linspace(70, 90, len(index)) + offset})
+
+
+def test_identical_charts_are_built_once():
+    cache = ChartCache()
+    first = cache.spec("line", price_frame(), x="data:T", y="preco_bpd_US:Q", y_title="Preço")
+    # Outro objeto com os mesmos dados e parâmetros reaproveita o spec
+    second = cache.spec("line", price_frame(), x="data:T", y="preco_bpd_US:Q", y_title="Preço")
+    assert second is first
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_changed_data_or_params_miss():
+    cache = ChartCache()
+    base = cache.spec("line", price_frame(), x="data:T", y="preco_bpd_US:Q", y_title="Preço")
+    other_data = cache.spec("line", price_frame(1.0), x="data:T", y="preco_bpd_US:Q", y_title="Preço")
+    other_params = cache.spec("line", price_frame(), x="data:T", y="preco_bpd_US:Q", y_title="Preço", color="red")
+    assert cache.stats()["misses"] == 3 and cache.stats()["hits"] == 0
+    assert other_data != base and other_params != base
+
+
+def test_cached_spec_matches_fresh_chart():
+    import altair as alt
+
+    data = price_frame()
+    spec = ChartCache().spec("line", data, x="data:T", y="preco_bpd_US:Q", y_title="Preço")
+    fresh = alt.Chart(data).mark_line().encode(
+        x=alt.X("data:T", title="Data", axis=alt.Axis(format="%Y-%m", tickCount="month")),
+        y=alt.Y("preco_bpd_US:Q", title="Preço"),
+    ).properties(width=500, height=300).to_dict()
+    assert spec == fresh
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+from cache import DataCache
+from database import BigQuery, MarketData
+from fixtures import FakeClient
+from snapshot import SnapshotStore
+
+
+def loader(client, tmp_path, incremental=True):
+    return BigQuery(client=client, cache=DataCache(), incremental=incremental,
+                    snapshots=SnapshotStore(str(tmp_path)), offline=False)
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_incremental_load_matches_full_load(tmp_path):
+    client = FakeClient(years=5)
+    full_rows = client.df
+    client.df = full_rows.iloc[:-10]
+
+    bigquery = loader(client, tmp_path / "incremental")
+    held_df, _ = bigquery.create_dfs()
+    client.df = full_rows
+    ipea_df, merged_df = bigquery.refresh_dfs()
+
+    # A segunda carga só pediu as linhas posteriores ao último dia já tratado
+    assert client.queries[-1] == held_df.index.max().date()
+
+    expected_ipea_df, expected_merged_df = loader(client, tmp_path / "full", incremental=False).create_dfs()
+    pd.testing.assert_frame_equal(ipea_df, expected_ipea_df, check_freq=False)
+    pd.testing.assert_frame_equal(merged_df, expected_merged_df)
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_incremental_load_without_new_rows(tmp_path):
+    client = FakeClient(years=5)
+    bigquery = loader(client, tmp_path)
+    held_df, _ = bigquery.create_dfs()
+    ipea_df, _ = bigquery.refresh_dfs()
+    pd.testing.assert_frame_equal(ipea_df, held_df)
+
+
+def market_frame():
+    index = pd.bdate_range("2019-01-01", "2019-03-29", name="Date")
+    return pd.DataFrame({
+        "indice_dolar_eua_dxy": 96.0 + index.dayofyear / 100,
+        "tx_juros_eua": 2.5 + index.dayofyear / 1000,
+    }, index=index)
+
+
+def test_market_data_serves_fixture_frame(tmp_path):
+    fixture = market_frame()
+    # Cache e snapshots vazios: se o yfinance fosse chamado, o teste falharia sem rede
+    market_data = MarketData(cache=DataCache(), snapshots=SnapshotStore(str(tmp_path)), offline=True, fixture=fixture)
+    pd.testing.assert_frame_equal(market_data.get(), fixture)
+
+
+def test_market_data_reads_fixture_parquet(tmp_path):
+    path = tmp_path / "market.parquet"
+    market_frame().to_parquet(path)
+    market_data = MarketData(cache=DataCache(), snapshots=SnapshotStore(str(tmp_path)), offline=True, fixture=str(path))
+    pd.testing.assert_frame_equal(market_data.get(), market_frame(), check_freq=False)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from decomposition import seasonal_decompose, DecompositionService
+
+statsmodels_seasonal = pytest.importorskip("statsmodels.tsa.seasonal")
+
+
+def price_series(days=3 * 365, seed=0):
+    # Série diária positiva com ciclo anual, como a do IPEA
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2019-01-01", periods=days, freq="D", name="data")
+    cycle = 5 * np.sin(2 * np.pi * np.arange(days) / 365)
+    return pd.Series(70 + cycle + np.cumsum(rng.normal(0, 0.5, days)), index=index, name="preco_bpd_US")
+
+
+def assert_same(result, expected):
+    for name in ("trend", "seasonal", "resid"):
+        np.testing.assert_allclose(getattr(result, name).to_numpy(), np.asarray(getattr(expected, name)), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("model", ["additive", "multiplicative"])
+@pytest.mark.parametrize("period", [12, 365])
+def test_matches_statsmodels(model, period):
+    series = price_series()
+    expected = statsmodels_seasonal.seasonal_decompose(series, model=model, period=period)
+    assert_same(seasonal_decompose(series, period, model), expected)
+
+
+@pytest.mark.parametrize("model", ["additive", "multiplicative"])
+@pytest.mark.parametrize("period", [12, 365])
+def test_range_of_base_matches_statsmodels(model, period):
+    # Recortes contínuos reaproveitam a tendência da série inteira
+    base = price_series()
+    series = base.iloc[100:100 + 2 * 365 + 30]
+    expected = statsmodels_seasonal.seasonal_decompose(series, model=model, period=period)
+    assert_same(DecompositionService().decompose(series, period, model, base=base), expected)
+
+
+def test_rejects_short_or_missing_series():
+    series = price_series(days=20)
+    with pytest.raises(ValueError):
+        seasonal_decompose(series, 12)
+    series = price_series(days=60)
+    series.iloc[5] = np.nan
+    with pytest.raises(ValueError):
+        seasonal_decompose(series, 12)
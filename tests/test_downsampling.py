@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from downsampling import downsample, lttb
+
+
+def reference_lttb(x, y, threshold):
+    # LTTB ponto a ponto, como no algoritmo original (Steinarsson, 2013)
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        best, best_area = None, -1.0
+        for j in range(int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def random_walk(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), np.cumsum(rng.normal(0, 1, n))
+
+
+@pytest.mark.parametrize("n, max_points", [(100, 10), (1000, 37), (5000, 1000), (1001, 1000)])
+def test_lttb_matches_reference(n, max_points):
+    x, y = random_walk(n)
+    np.testing.assert_array_equal(lttb(x, y, max_points), reference_lttb(x, y, max_points))
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_keeps_budget_and_endpoints(method):
+    index = pd.date_range("2000-01-01", periods=8000, freq="D")
+    _, y = random_walk(len(index))
+    df = pd.DataFrame({"ds": index, "yhat": y})
+    df.loc[[0, 4000, 7999], "yhat"] = [y[0] - 1000, y[4000] + 1000, y[7999] + 500]
+
+    result = downsample(df, "ds", "yhat", max_points=500, method=method)
+    assert len(result) <= 500
+    assert result.index.is_monotonic_increasing and result.index.is_unique
+    # Primeiro e último ponto (extremos dos seus buckets) e o pico isolado sobrevivem à redução
+    assert {0, 4000, 7999} <= set(result.index)
+
+
+def test_downsample_skips_missing_values_and_short_frames():
+    df = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=3000, freq="D"), "yhat": np.linspace(0, 1, 3000)})
+    df.loc[df.index[::7], "yhat"] = np.nan
+    result = downsample(df, "ds", "yhat", max_points=200)
+    assert len(result) <= 200
+    assert result["yhat"].notna().all()
+    # Dentro do orçamento o frame volta inteiro
+    short = df.iloc[:150]
+    assert downsample(short, "ds", "yhat", max_points=200) is short
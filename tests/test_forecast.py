@@ -0,0 +1,123 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from cache import LRUCache
+from class_prophet import Prophet_model, predict
+from model_registry import ModelRegistry
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modelo_prophet.pkl')
+
+
+@pytest.fixture
+def prophet_model(tmp_path):
+    # Cópia do modelo original com registro e cache próprios: a tabela é gravada ao lado do pkl
+    path = tmp_path / 'modelo.pkl'
+    shutil.copy(MODEL_PATH, path)
+    return Prophet_model(str(path), registry=ModelRegistry(), forecasts=LRUCache(max_bytes=64 * 1024 ** 2))
+
+
+def test_point_mode_is_served_from_the_forecast_table(prophet_model):
+    expected, _ = prophet_model.make_df_and_predict('2025-03-01', history_tail=30, uncertainty_samples=0)
+    prophet_model.build_forecast_table('2025-12-31')
+    prophet_model.forecasts = LRUCache(max_bytes=64 * 1024 ** 2)
+
+    # O yhat não depende da amostragem: a tabela atende o modo pontual com ou sem semente
+    for seed in (None, 7):
+        df_forecast, _ = prophet_model.make_df_and_predict('2025-03-01', history_tail=30, uncertainty_samples=0, seed=seed)
+        assert list(df_forecast.columns) == ['ds', 'yhat']
+        assert df_forecast['yhat'].dtype == np.float64
+        np.testing.assert_array_equal(df_forecast['ds'].values, expected['ds'].values)
+        # A tabela guarda float32
+        np.testing.assert_allclose(df_forecast['yhat'].values, expected['yhat'].values, rtol=1e-6)
+    assert len(prophet_model.forecasts) == 0
+
+
+def test_shorter_point_horizon_is_a_prefix_of_a_cached_forecast(prophet_model, monkeypatch):
+    longer, _ = prophet_model.make_df_and_predict('2025-06-30', include_history=False, uncertainty_samples=0)
+    fresh = Prophet_model(prophet_model.model_path, registry=ModelRegistry(), forecasts=LRUCache(max_bytes=64 * 1024 ** 2))
+    expected, expected_range = fresh.make_df_and_predict('2025-01-15', include_history=False, uncertainty_samples=0)
+
+    # O horizonte menor sai do cache, sem chamar o modelo
+    def fail(*args, **kwargs):
+        raise AssertionError("predict chamado para um horizonte já coberto")
+    monkeypatch.setattr('class_prophet.predict', fail)
+    df_forecast, data_range = prophet_model.make_df_and_predict('2025-01-15', include_history=False, uncertainty_samples=0)
+
+    assert data_range == expected_range
+    pd.testing.assert_frame_equal(df_forecast, expected)
+    pd.testing.assert_frame_equal(df_forecast, longer.iloc[:len(expected)])
+
+
+class StubModel:
+    # Modelo mínimo com a interface usada por predict_batch: yhat = dias desde o início + regressores
+    uncertainty_samples = 0
+
+    def __init__(self, extra_regressors) -> None:
+        self.history = pd.DataFrame({'ds': pd.date_range('2024-01-01', '2024-06-30', freq='D')})
+        self.extra_regressors = {name: {} for name in extra_regressors}
+
+    def predict(self, df, vectorized=True):
+        yhat = (df['ds'] - self.history['ds'].min()).dt.days.astype('float64')
+        for name in self.extra_regressors:
+            yhat = yhat + df[name]
+        return pd.DataFrame({'ds': df['ds'], 'yhat': yhat})
+
+
+@pytest.fixture
+def stub_model(tmp_path):
+    path = tmp_path / 'stub.pkl'
+    with open(path, 'wb') as f:
+        pickle.dump(StubModel(['dxy']), f)
+    return Prophet_model(str(path), registry=ModelRegistry(loader=pickle.load), forecasts=LRUCache(max_bytes=1024 ** 2))
+
+
+def test_predict_batch_applies_scenarios(stub_model):
+    base, shocked = stub_model.predict_batch([
+        {'end': '2024-07-05', 'regressors': {'dxy': 0.0}},
+        {'end': '2024-07-03', 'regressors': {'dxy': 10.0}},
+    ])
+    assert list(base['yhat']) == [182.0, 183.0, 184.0, 185.0, 186.0]
+    assert list(shocked['yhat']) == [192.0, 193.0, 194.0]
+
+
+def test_predict_batch_rejects_unknown_regressors(stub_model):
+    with pytest.raises(ValueError, match='dxy_typo'):
+        stub_model.predict_batch([{'end': '2024-07-05', 'regressors': {'dxy': 0.0, 'dxy_typo': 1.0}}])
+
+
+class SamplingModel:
+    # Sorteia os "intervalos" com o gerador global do NumPy, em passos separados por pausas
+    uncertainty_samples = 10
+
+    def predict(self, df, vectorized=True):
+        draws = []
+        for _ in range(5):
+            draws.append(np.random.normal())
+            time.sleep(0.001)
+        return draws
+
+
+def test_seeded_sampling_is_isolated_from_unseeded_threads():
+    model = SamplingModel()
+    expected = predict(model, None, seed=123)
+    stop = threading.Event()
+
+    def unseeded():
+        while not stop.is_set():
+            predict(model, None)
+
+    threads = [threading.Thread(target=unseeded) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        results = [predict(model, None, seed=123) for _ in range(20)]
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert all(result == expected for result in results)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from timeseries import time_series
+
+
+def daily_frame():
+    index = pd.date_range("2020-01-01", "2021-12-31", freq="D", name="data")
+    return pd.DataFrame({"preco_bpd_US": np.linspace(50, 80, len(index)), "year": index.year}, index=index)
+
+
+def test_container_is_reused_for_the_same_frame():
+    assert time_series(daily_frame()) is time_series(daily_frame())
+
+
+def test_container_is_rebuilt_when_any_column_changes():
+    df = daily_frame()
+    first = time_series(df)
+    changed = df.copy()
+    changed["year"] = changed["year"] + 1
+    second = time_series(changed)
+    assert second is not first
+    assert (second.df["year"] == changed["year"]).all()
+
+
+def test_range_and_select_match_masks():
+    ts = time_series(daily_frame())
+    start, end = pd.Timestamp("2020-03-15"), pd.Timestamp("2021-02-10")
+    df = ts.df
+    pd.testing.assert_frame_equal(ts.range(start, end), df[(df.index >= start) & (df.index <= end)])
+    expected = df[(df.index >= start) & (df.index <= end) & df.index.year.isin([2020]) & df.index.month.isin([4, 12])]
+    pd.testing.assert_frame_equal(ts.select(start, end, [2020], [4, 12]), expected)
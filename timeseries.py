@@ -0,0 +1,111 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from cache import frame_fingerprint
+
+# COMPACT_MODE=1 guarda os preços em float32, num único array somente leitura compartilhado
+COMPACT_MODE = os.environ.get("COMPACT_MODE", "0") == "1"
+
+
+def compact_frame(df):
+    # Colunas de ponto flutuante em um único bloco float32 somente leitura. Colunas inteiras
+    # como 'year' não são guardadas: ano e mês são derivados do índice quando necessários.
+    columns = [column for column in df.columns if pd.api.types.is_float_dtype(df[column])]
+    values = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float32))
+    values.flags.writeable = False
+    return pd.DataFrame(values, index=df.index, columns=columns, copy=False)
+
+
+class TimeSeriesFrame:
+    # Envolve um DataFrame com DatetimeIndex ordenado e responde filtros de datas com busca
+    # binária (recortes sem cópia). Com o índice ordenado, cada mês é um bloco contínuo de
+    # linhas: as posições desses blocos ficam pré-calculadas para os filtros de ano e mês.
+    def __init__(self, df, compact=False, dropna=None) -> None:
+        # dropna: coluna cujas linhas ausentes são descartadas uma única vez, na montagem
+        if dropna is not None:
+            df = df.dropna(subset=[dropna])
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        if compact:
+            df = compact_frame(df)
+        # As sessões recebem recortes (views) deste frame, nunca cópias
+        self.df = df
+        self.index = df.index.values
+
+        # Início de cada bloco (ano, mês) e o ano/mês correspondente
+        keys = df.index.year.to_numpy() * 12 + df.index.month.to_numpy() - 1
+        if len(keys):
+            self.block_starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        else:
+            self.block_starts = np.array([], dtype=np.int64)
+        self.block_ends = np.append(self.block_starts[1:], len(keys)) if len(keys) else self.block_starts
+        block_keys = keys[self.block_starts]
+        self.block_years = block_keys // 12
+        self.block_months = block_keys % 12 + 1
+
+    def bounds(self, start_date, end_date):
+        lo = np.searchsorted(self.index, np.datetime64(pd.to_datetime(start_date)), side='left')
+        hi = np.searchsorted(self.index, np.datetime64(pd.to_datetime(end_date)), side='right')
+        return lo, hi
+
+    def range(self, start_date, end_date):
+        # Equivale a df[(df.index >= start_date) & (df.index <= end_date)], sem varrer a série
+        lo, hi = self.bounds(start_date, end_date)
+        return self.df.iloc[lo:hi]
+
+    def blocks(self, start_date, end_date):
+        # Blocos mensais que cruzam o intervalo, recortados nas pontas
+        lo, hi = self.bounds(start_date, end_date)
+        first = np.searchsorted(self.block_starts, lo, side='right') - 1
+        last = np.searchsorted(self.block_starts, hi, side='left')
+        first = max(first, 0)
+        starts = np.maximum(self.block_starts[first:last], lo)
+        ends = np.minimum(self.block_ends[first:last], hi)
+        nonempty = starts < ends
+        return starts[nonempty], ends[nonempty], self.block_years[first:last][nonempty], self.block_months[first:last][nonempty]
+
+    def years(self, start_date, end_date):
+        _, _, years, _ = self.blocks(start_date, end_date)
+        return pd.Index(pd.unique(years))
+
+    def months(self, start_date, end_date, years=None):
+        _, _, block_years, block_months = self.blocks(start_date, end_date)
+        if years is not None:
+            block_months = block_months[np.isin(block_years, list(years))]
+        return pd.Index(pd.unique(block_months))
+
+    def select(self, start_date, end_date, years=None, months=None):
+        # Filtro por datas, anos e meses usando as posições dos blocos em vez de máscaras
+        starts, ends, block_years, block_months = self.blocks(start_date, end_date)
+        keep = np.ones(len(starts), dtype=bool)
+        if years is not None:
+            keep &= np.isin(block_years, list(years))
+        if months is not None:
+            keep &= np.isin(block_months, list(months))
+
+        if keep.all():
+            lo, hi = self.bounds(start_date, end_date)
+            return self.df.iloc[lo:hi]
+
+        starts, ends = starts[keep], ends[keep]
+        if len(starts) == 0:
+            return self.df.iloc[:0]
+        positions = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])
+        return self.df.iloc[positions]
+
+
+# Contêineres já montados, por fingerprint do frame inteiro (índice e todas as colunas)
+_frames = {}
+_frames_lock = threading.Lock()
+
+
+def time_series(df, compact=False, dropna=None, max_entries=8):
+    key = (frame_fingerprint(df), compact, dropna)
+    with _frames_lock:
+        frame = _frames.get(key)
+        if frame is None:
+            if len(_frames) >= max_entries:
+                _frames.pop(next(iter(_frames)))
+            frame = _frames[key] = TimeSeriesFrame(df, compact, dropna)
+    return frame
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from backtest import to_prophet_frame, data_hash
+from manifest import MODELS_DIR, manifest_path, read_manifest, latest_model_path
+
+# Pipeline de treino offline: cada execução gera um artefato versionado em MODELS_DIR
+# (prophet-<versão>.pkl) com um manifesto ao lado (prophet-<versão>.json, ver manifest.py)
+
+
+def warm_start_params(model):
+    # Parâmetros de um modelo já ajustado como ponto de partida do otimizador
+    # (receita da documentação do Prophet)
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = model.params[name][0][0] if model.mcmc_samples == 0 else np.mean(model.params[name])
+    for name in ['delta', 'beta']:
+        params[name] = model.params[name][0] if model.mcmc_samples == 0 else np.mean(model.params[name], axis=0)
+    return params
+
+
+def train_model(ipea_df, directory=MODELS_DIR, previous_path=None):
+    import joblib
+    from prophet import Prophet
+
+    df_base = to_prophet_frame(ipea_df)
+
+    init = None
+    previous_manifest = None
+    if previous_path is not None:
+        previous_manifest = read_manifest(previous_path)
+        init = warm_start_params(joblib.load(previous_path))
+
+    # Com init, o Prophet parte dos parâmetros do modelo anterior (parâmetros com
+    # formato incompatível são descartados por ele e voltam ao padrão)
+    prophet_object = Prophet(interval_width=0.9)
+    start = time.perf_counter()
+    if init is None:
+        prophet_object.fit(df_base)
+    else:
+        prophet_object.fit(df_base, init=init)
+    fit_seconds = time.perf_counter() - start
+
+    version = time.strftime("%Y%m%dT%H%M%S")
+    os.makedirs(directory, exist_ok=True)
+    model_path = os.path.join(directory, f"prophet-{version}.pkl")
+
+    manifest = {
+        'version': version,
+        'model_file': os.path.basename(model_path),
+        # Primeiro dia após os dados de treino: início das previsões
+        'cutoff': (df_base['ds'].max() + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+        'train_start': df_base['ds'].min().strftime('%Y-%m-%d'),
+        'rows': len(df_base),
+        'data_hash': data_hash(df_base),
+        'fit_seconds': round(fit_seconds, 3),
+        'warm_start_from': None if previous_manifest is None else previous_manifest['version'],
+        'created_at': pd.Timestamp.now(tz='UTC').isoformat(),
+    }
+
+    # O manifesto é escrito por último: uma versão sem manifesto não é listada
+    joblib.dump(prophet_object, model_path)
+    with open(manifest_path(model_path) + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path(model_path) + '.tmp', manifest_path(model_path))
+
+    return model_path, manifest
+
+
+# Uso: python train.py [--cold]
+if __name__ == "__main__":
+    from database import BigQuery
+
+    # Consulta o BigQuery: o snapshot da partida a quente pode estar desatualizado
+    ipea_df, _ = BigQuery().refresh_dfs()
+
+    previous_path = None if '--cold' in sys.argv else latest_model_path()
+    if previous_path is not None:
+        previous_manifest = read_manifest(previous_path)
+        if previous_manifest['data_hash'] == data_hash(to_prophet_frame(ipea_df)):
+            print(f"Sem dados novos desde a versão {previous_manifest['version']}")
+            sys.exit(0)
+
+    model_path, manifest = train_model(ipea_df, previous_path=previous_path)
+    print(json.dumps(manifest, indent=2))
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from class_prophet import Prophet_model, FORECAST_TABLE_END
+from database import BigQuery
+from decomposition import decomposition_service
+from timeseries import time_series, COMPACT_MODE
+
+# Períodos de decomposição usados pelas abas Relatório e Dashboard
+DECOMPOSITION_PERIODS = (12, 365)
+
+
+class ForecastWorker:
+    # Calcula previsões e decomposições fora do script do Streamlit e publica os resultados
+    # nos caches compartilhados (previsões e decomposition_service). Quando chega um novo
+    # modelo ou uma atualização dos dados, recalcula tudo para que nenhuma sessão espere.
+    def __init__(self, model_factory=Prophet_model, data_source=BigQuery, poll_seconds=60, max_workers=2, max_futures=128) -> None:
+        self.model_factory = model_factory
+        self.data_source = data_source
+        self.poll_seconds = poll_seconds
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast-worker")
+        # Previsões pedidas pelas sessões, das mais antigas às mais recentes (no máximo max_futures)
+        self.futures = OrderedDict()
+        self.max_futures = max_futures
+        self.version = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.watch, name="forecast-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def watch(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"ForecastWorker: falha ao atualizar os resultados: {e}")
+            time.sleep(self.poll_seconds)
+
+    def current_version(self):
+        model = self.model_factory()
+        ipea_df, _ = self.data_source().create_dfs()
+        return (model.model_path, model.fingerprint(), len(ipea_df), ipea_df.index.max())
+
+    def check(self):
+        version = self.current_version()
+        if version != self.version:
+            self.precompute()
+            self.version = version
+
+    def precompute(self):
+        model = self.model_factory()
+        ipea_df, _ = self.data_source().create_dfs()
+
+        # A previsão até o fim do horizonte suportado fica no cache de previsões: horizontes
+        # menores pedidos pelas sessões passam a ser apenas recortes dela
+        model.make_df_and_predict(FORECAST_TABLE_END, include_history=False, uncertainty_samples=0)
+        # Valores ajustados do histórico usados pela aba Modelo (history_tail), no mesmo modo pontual
+        model.history_forecast(model.load_stats(), 0, None)
+
+        # Decomposições da série inteira ficam no cache do serviço de decomposição
+        series = time_series(ipea_df, compact=COMPACT_MODE, dropna='preco_bpd_US').df['preco_bpd_US']
+        for period in DECOMPOSITION_PERIODS:
+            decomposition_service.decompose(series, period)
+
+    def submit_forecast(self, max_date, **options):
+        # Pedidos iguais de várias sessões compartilham a mesma execução
+        model = self.model_factory()
+        key = (model.model_path, model.fingerprint(), str(max_date), tuple(sorted(options.items())))
+
+        with self._lock:
+            future = self.futures.get(key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self.pool.submit(model.make_df_and_predict, max_date, **options)
+                self.futures[key] = future
+            self.futures.move_to_end(key)
+            while len(self.futures) > self.max_futures:
+                self.futures.popitem(last=False)
+        return future
+
+
+# Worker compartilhado por todas as sessões do processo
+forecast_worker = ForecastWorker()